@@ -1,29 +1,254 @@
 from telethon import TelegramClient, events, Button
 import random
-from parser.advanced_parser import advanced_parser
+from parser.advanced_parser import advanced_parser, parse_khrustalev, TradeSignal
 from exchanges.multi_exchange import multi_exchange
+from exchanges.price_tracker import price_tracker
+from exchanges.utils import is_loop_closed_error, json_loads
 from config_telethon import API_ID, API_HASH, MONITORED_CHANNELS, BOT_TOKEN, WEB_APP_URL
-from config_telethon import is_admin, is_whitelisted, add_user, remove_user, ADMINS, WHITELIST
-from web.app import get_trading_data
+from config_telethon import is_admin as _config_is_admin, is_whitelisted as _config_is_whitelisted
+from config_telethon import add_user as _config_add_user, remove_user as _config_remove_user, ADMINS, WHITELIST
+from web.app import get_trading_data, SignalData
 import logging
 import asyncio
+import itertools
+import math
 import time
 import os
 import re
-from config_telethon import get_channel_source
+from config_telethon import get_channel_source as _config_get_channel_source
 import sys
 from telethon.errors import TypeNotFoundError
-from typing import Dict, Optional, Set, Any
+from telethon.sessions import SQLiteSession
+from typing import Dict, List, Optional, Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from functools import wraps
+from functools import wraps, lru_cache
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+# Проверки доступа дергаются в каждом обработчике - кешируем по user_id.
+# Кеш сбрасывается при изменении белого списка через add_user/remove_user и раз в минуту
+# в _cleanup_tasks, чтобы ручная правка users.json (например, удаление пользователя) доходила без перезапуска
+@lru_cache(maxsize=2048)
+def is_admin(user_id: int) -> bool:
+    """Проверяет права администратора (с кешем)"""
+    return _config_is_admin(user_id)
+
+
+@lru_cache(maxsize=2048)
+def is_whitelisted(user_id: int) -> bool:
+    """Проверяет доступ к боту (с кешем)"""
+    return _config_is_whitelisted(user_id)
+
+
+def clear_access_cache():
+    """Сбрасывает кеш проверок доступа"""
+    is_admin.cache_clear()
+    is_whitelisted.cache_clear()
+
+
+def add_user(user_id: int):
+    """Добавляет пользователя в белый список и сбрасывает кеш доступа"""
+    _config_add_user(user_id)
+    clear_access_cache()
+
+
+def remove_user(user_id: int):
+    """Удаляет пользователя из белого списка и сбрасывает кеш доступа"""
+    _config_remove_user(user_id)
+    clear_access_cache()
+
+
+# Источник канала определяется на каждое входящее сообщение, а набор каналов фиксирован
+@lru_cache(maxsize=256)
+def get_channel_source(chat_id: int) -> str:
+    """Возвращает название источника по ID канала (с кешем)"""
+    return _config_get_channel_source(chat_id)
+
+
+# Разделитель блоков в логах
+LOG_SEP = "-" * 60
+
+# Лог распознанного сигнала - одна запись вместо строки на каждое поле
+_RECOGNIZED_SIGNAL_LOG = (
+    "✅ СИГНАЛ РАСПОЗНАН:\n"
+    "   Символ: %s\n"
+    "   Направление: %s\n"
+    "   Входы: %s\n"
+    "   Лимитные входы: %s\n"
+    "   Тейки: %s\n"
+    "   Стоп: %s\n"
+    "   Плечо: %s\n"
+    "   Маржа: %s\n"
+    "   Источник: %s\n"
+    "   Рыночный вход: %s\n"
+    + LOG_SEP
+)
+
+# Лог сигнала Хрусталева, собранного из двух сообщений
+_KHRUSTALEV_MERGED_LOG = (
+    "✅ ОБЪЕДИНЕННЫЙ СИГНАЛ ХРУСТАЛЕВА:\n"
+    "   Символ: %s\n"
+    "   Направление: %s\n"
+    "   Вход: %s\n"
+    "   Тейки: %s\n"
+    "   Стоп: %s\n"
+    + LOG_SEP
+)
+
+# Лог сделки, добавленной вручную через /addsignal
+_MANUAL_SIGNAL_LOG = (
+    "✅ РУЧНАЯ СДЕЛКА ДОБАВЛЕНА:\n"
+    "   ID: %s\n"
+    "   Символ: %s\n"
+    "   Направление: %s\n"
+    "   Вход: %s\n"
+    "   Стоп: %s\n"
+    "   Тейки: %s\n"
+    "   Плечо: %s\n"
+    "   Маржа: %s\n"
+    "   Источник: %s"
+)
+
+# Конкретные торговые данные в сообщении (компилируются один раз при импорте)
+CONCRETE_DATA_PATTERNS = (
+    r'\d+[.,]\d+\s*\$',  # Цены с долларом: 0.48$, 3$
+    r'[TТ][PП]\d*\s*:?\s*\d+[.,]\d+',  # TP1: 0.48, ТП2: 0.58
+    r'тейк\s*профит',  # Упоминание тейк-профитов
+    r'стоп\s*лосс',  # Упоминание стоп-лосса
+    r'вход\s*:?\s*\d+[.,]\d+',  # Вход: 0.9
+    r'добор\s*\d+[.,]\d+',  # Добор 0.78
+    r'лимитный\s*ордер',  # Лимитный ордер
+    r'маржа\s*\d+',  # Маржа 0.3%
+    r'фикс\s*\d+%',  # Фикс 20% объема
+)
+# Одна альтернация вместо девяти проходов по тексту
+_CONCRETE_UNION = re.compile('|'.join(f'(?:{p})' for p in CONCRETE_DATA_PATTERNS), re.IGNORECASE)
+_NUM_RE = re.compile(r'\d+[.,]\d+')  # Числа с дробной частью
+
+# Любой тикер, который способен найти парсер (BTC/USDT, #INJ, $ZEC, "Avax Short"...),
+# содержит хотя бы две латинские буквы подряд; без них символ всегда будет UNKNOWN
+_SYMBOL_PREFILTER = re.compile(r'[A-Za-z]{2}')
+
+
+def _parse_price_list(value_str: str) -> Optional[List[float]]:
+    """Разбирает список цен вида [value1,value2,value3]; None - если это не список конечных чисел"""
+    try:
+        values = json_loads(value_str)
+    except ValueError:  # JSONDecodeError и json, и orjson - наследники ValueError
+        # Формы, которые JSON не принимает, а float() понимает: "+5", "05000", "1_000", ".5", "5."
+        if not (value_str.startswith('[') and value_str.endswith(']')):
+            return None
+        try:
+            values = [float(v) for v in value_str[1:-1].split(',')]
+        except ValueError:
+            return None
+    if not isinstance(values, list) or not values:
+        return None
+    # bool - подкласс int, но true/false ценой не считаем
+    if any(isinstance(v, bool) or not isinstance(v, (int, float)) for v in values):
+        return None
+    prices = [float(v) for v in values]
+    # inf/nan ценой не бывают (json и orjson к тому же понимают их по-разному)
+    if not all(math.isfinite(v) for v in prices):
+        return None
+    return prices
+
+
+def _sort_take_profits(signal, values) -> List[float]:
+    """Тейки по ходу сделки: для LONG по возрастанию, для остальных по убыванию (как знак в _evaluate_signal)"""
+    return sorted(values, reverse=signal.direction != "LONG")
+
+
+# Карточки сделок для /stats, /active и /activesignals
+_STATS_CARD = (
+    "{direction_emoji} **{symbol}** {direction}\n"
+    "   {pnl_emoji} PnL: {pnl:+.2f}%\n"
+    "   🎯 Тейков: {tp_count}\n"
+    "   📍 Источник: {source}\n\n"
+)
+_ACTIVE_CARD = (
+    "{direction_emoji} **{symbol}** {direction}\n"
+    "   💰 Цена: {current_price}\n"
+    "   {pnl_emoji} PnL: {pnl:+.2f}%\n"
+    "   🎯 Тейков: {tp_count}\n\n"
+)
+_ACTIVE_ID_CARD = (
+    "{direction_emoji} **{symbol}** {direction}\n"
+    "   🆔 ID: `{signal_id}`\n"
+    "   💰 Текущая цена: {current_price}\n"
+    "   {pnl_emoji} PnL: {pnl:+.2f}%\n"
+    "   🎯 Тейков: {tp_count}\n"
+    "   📍 Источник: {source}\n\n"
+)
+
+# Справка /help (для админов - с админскими командами); собирается один раз
+_HELP_TEXT = """
+❓ **Помощь по Trading Bot**
+
+**Основные команды:**
+/start - Главное меню
+/dashboard - Открыть веб-интерфейс  
+/stats - Статистика сделок
+/active - Активные сделки
+        """
+_ADMIN_HELP_TEXT = _HELP_TEXT + (
+    "\n\n**👑 Админ команды:**\n"
+    "/admin - Админ панель\n"
+    "/adminhelp - Подробная справка по админ-командам\n"
+    "/adduser <id> - Добавить пользователя\n"
+    "/removeuser <id> - Удалить пользователя\n"
+    "/listusers - Список пользователей\n"
+    "/editsignal - Редактировать сделку\n"
+    "/addsignal - Добавить сделку вручную\n"
+    "/activesignals - Список сделок с ID\n"
+)
+
+# Админ панель (/admin и inline кнопка): счетчики подставляются при отправке
+_ADMIN_PANEL_TEMPLATE = """
+👑 **Админ панель**
+
+**Статистика пользователей:**
+• Админы: {admins}
+• Белый список: {whitelist}
+• Активных сделок: {active}
+
+**👥 Управление пользователями:**
+`/adduser <user_id>` - Добавить пользователя
+`/removeuser <user_id>` - Удалить пользователя  
+`/listusers` - Список пользователей
+
+**📊 Управление сделками:**
+`/editsignal <signal_id> <param> <value>` - Редактировать сделку
+`/addsignal` - Добавить сделку вручную
+`/activesignals` - Список сделок с ID
+
+**🛠 Другие команды:**
+`/adminhelp` - Подробная справка по командам
+
+**📝 Примеры:**
+`/adduser 123456789`
+`/editsignal 12 stop_loss 50000`
+`/editsignal 12 take_profits [51000,52000,53000]`
+`/addsignal` - и следуйте инструкциям
+        """
+
 # Получаем глобальный экземпляр trading_data
 trading_data = get_trading_data()
 
+
+def _cached_symbol_data(cache: Dict[str, Dict[str, Any]], symbol: str) -> Dict[str, Any]:
+    """trading_data.get_symbol_data с кешем на один ответ: несколько сделок по символу - одна копия под блокировкой"""
+    symbol_data = cache.get(symbol)
+    if symbol_data is None:
+        symbol_data = cache[symbol] = trading_data.get_symbol_data(symbol)
+    return symbol_data
+
+
 # Проверяем доступность InputWebAppInfo
 try:
     from telethon.tl.types import InputWebAppInfo
@@ -40,14 +265,28 @@ except ImportError:
             self.url = url
 
 
-@dataclass
+class WALSQLiteSession(SQLiteSession):
+    """Файл сессии Telethon в режиме WAL: обновление состояния на каждое сообщение без fsync журнала"""
+
+    def _cursor(self):
+        is_new_connection = self._conn is None
+        cursor = super()._cursor()
+        if is_new_connection:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.execute('PRAGMA temp_store=MEMORY')
+        return cursor
+
+
+@dataclass(slots=True)
 class UserState:
     """Класс для хранения состояния пользователя"""
     waiting_for_signal: bool = False
     signal_data: Dict[str, Any] = field(default_factory=dict)
+    last_activity: float = field(default_factory=time.monotonic)  # Для очистки брошенных состояний
 
 
-@dataclass
+@dataclass(slots=True)
 class PriceCacheEntry:
     """Запись в кэше цен"""
     price: float
@@ -58,44 +297,62 @@ class PriceCacheEntry:
 class PriceCache:
     """Кэш цен для оптимизации запросов к биржам"""
 
-    def __init__(self, ttl: int = 5):
-        self.cache: Dict[str, PriceCacheEntry] = {}
+    def __init__(self, ttl: int = 5, max_concurrency: int = 15, max_size: int = 512):
+        # Записи упорядочены по времени записи: самые старые - в начале
+        self.cache: "OrderedDict[str, PriceCacheEntry]" = OrderedDict()
         self.ttl = ttl  # время жизни кэша в секундах
+        self.max_size = max_size
+        # Ограничиваем число одновременных REST-запросов к биржам
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Запросы цен, которые уже выполняются: повторные промахи по символу ждут их же
+        self._pending: Dict[str, asyncio.Task] = {}
 
     async def get_price(self, symbol: str) -> tuple[Optional[float], Optional[str]]:
-        """Получает цену из кэша или от биржи"""
-        current_time = time.time()
+        """Получает цену из потока, кэша или от биржи"""
+        # Сначала берем цену из WebSocket-потока (без сетевого запроса)
+        stream_price = price_tracker.get_price(symbol)
+        if stream_price:
+            return stream_price, price_tracker.exchange_name
 
         # Проверяем кэш
-        if symbol in self.cache:
-            entry = self.cache[symbol]
-            if current_time - entry.timestamp < self.ttl:
-                return entry.price, entry.exchange
-
-        # Получаем свежую цену
+        entry = self.cache.get(symbol)
+        if entry is not None and time.monotonic() - entry.timestamp < self.ttl:
+            return entry.price, entry.exchange
+
+        # Получаем свежую цену (один запрос на символ, сколько бы сделок его ни ждало)
+        task = self._pending.get(symbol)
+        if task is None:
+            task = asyncio.create_task(self._fetch_price(symbol))
+            self._pending[symbol] = task
+            task.add_done_callback(lambda _: self._pending.pop(symbol, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_price(self, symbol: str) -> tuple[Optional[float], Optional[str]]:
+        """Запрашивает цену у бирж и кладет ее в кэш"""
         try:
-            price, exchange = await multi_exchange.get_current_price(symbol)
+            async with self._semaphore:
+                price, exchange = await multi_exchange.get_current_price(symbol)
             if price:
                 self.cache[symbol] = PriceCacheEntry(
                     price=price,
-                    timestamp=current_time,
+                    timestamp=time.monotonic(),
                     exchange=exchange
                 )
+                self.cache.move_to_end(symbol)
+                if len(self.cache) > self.max_size:
+                    self.cache.popitem(last=False)
             return price, exchange
         except Exception as e:
-            logger.error(f"❌ Ошибка получения цены для {symbol}: {e}")
+            logger.error("❌ Ошибка получения цены для %s: %s", symbol, e)
             return None, None
 
     def clear_old_entries(self):
-        """Очищает старые записи в кэше"""
-        current_time = time.time()
-        to_delete = []
-
-        for symbol, entry in self.cache.items():
-            if current_time - entry.timestamp > self.ttl * 2:
-                to_delete.append(symbol)
-
-        for symbol in to_delete:
+        """Очищает старые записи в кэше (с начала, до первой свежей записи)"""
+        cutoff = time.monotonic() - self.ttl * 2
+        while self.cache:
+            symbol, entry = next(iter(self.cache.items()))
+            if entry.timestamp >= cutoff:
+                break
             del self.cache[symbol]
 
 
@@ -104,9 +361,9 @@ def admin_only(func):
 
     @wraps(func)
     async def wrapper(self, event, *args, **kwargs):
-        # Проверяем, что это личное сообщение
+        # Админ-команды - только в личке. _dispatch_message отбрасывает групповые сообщения раньше,
+        # но обработчик может быть вызван и другим путем - молча игнорируем и здесь
         if not event.is_private:
-            await event.answer("❌ Эта команда доступна только в личных сообщениях")
             return
 
         # Проверяем права администратора
@@ -137,10 +394,12 @@ def private_only(func):
 
 
 class TelethonTradingBot:
+    # Счетчик ID сигналов общий для класса: после перезапуска бота новые ID
+    # не совпадут со старыми, которые еще лежат в trading_data
+    _signal_counter = itertools.count(1)
+
     def __init__(self):
         """Инициализация клиента Telethon"""
-        self._setup_telethon_error_handler()
-
         # 1) Получаем имя сессии (файл сессии Telethon)
         try:
             from config_telethon import SESSION_NAME as CONFIG_SESSION_NAME
@@ -148,7 +407,7 @@ class TelethonTradingBot:
             CONFIG_SESSION_NAME = None
 
         session_name = CONFIG_SESSION_NAME or os.getenv("SESSION_NAME") or "trading_session"
-        session = session_name  # Telethon создаст файл session_name.session
+        session = WALSQLiteSession(session_name)  # Telethon создаст файл session_name.session
 
         # 2) Берём прокси из proxy_settings (если есть). Превращаем в формат telethon.
         try:
@@ -183,15 +442,56 @@ class TelethonTradingBot:
             self.client = TelegramClient(session, API_ID, API_HASH, proxy=proxy_arg)
             logger.info("✅ Клиент Telethon создан успешно")
         except Exception as e:
-            logger.error(f"❌ Ошибка при создании клиента Telethon: {e}")
+            logger.error("❌ Ошибка при создании клиента Telethon: %s", e)
             self.client = None
 
         # 4) Обычные поля класса
-        self.active_signals: Dict[str, Any] = {}
+        self.active_signals: Dict[int, Any] = {}
+        self._signals_by_symbol: Dict[str, List[int]] = {}  # Индекс символ -> ID активных сигналов
         self.partial_signals: Dict[str, Any] = {}  # Кеш для неполных сигналов
-        self.partial_khrustalev_signals: Dict[str, Any] = {}  # Кеш для сигналов Хрусталева
-        self.user_states: Dict[int, UserState] = {}  # Состояния пользователей
+        # Кеш для сигналов Хрусталева, упорядоченный по времени добавления (последний - самый свежий)
+        self.partial_khrustalev_signals: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Состояния пользователей: упорядочены по последней активности (самые давние - в начале)
+        self.user_states: "OrderedDict[int, UserState]" = OrderedDict()
+        self.max_user_states = 10_000
+        self._monitored_chat_ids: frozenset = frozenset()  # ID мониторируемых каналов (заполняется в start)
+        self._khrustalev_chat_ids: frozenset = frozenset()  # Из них - каналы Хрусталева (заполняется в start)
+
+        # Таблицы разбора команд, кнопок клавиатуры и inline кнопок
+        self._command_handlers = {
+            '/start': self.handle_start_command,
+            '/dashboard': self.handle_dashboard_command,
+            '/stats': self.handle_stats_command,
+            '/active': self.handle_active_command,
+            '/help': self.handle_help_command,
+            # Админские команды
+            '/admin': self.handle_admin_command,
+            '/adminhelp': self.handle_admin_help_command,
+            '/adduser': self.handle_add_user_command,
+            '/removeuser': self.handle_remove_user_command,
+            '/listusers': self.handle_list_users_command,
+            '/editsignal': self.handle_edit_signal_command,
+            '/addsignal': self.handle_add_signal_command,
+            '/activesignals': self.handle_active_signals_command,
+        }
+        self._button_handlers = {
+            "📊 Dashboard": self.handle_dashboard_command,
+            "📈 Статистика": self.handle_stats_command,
+            "🔄 Активные сделки": self.handle_active_command,
+            "❓ Помощь": self.handle_help_command,
+            "👑 Админ панель": self._handle_admin_button,
+        }
+        self._callback_handlers = {
+            b"stats": self._send_stats_response,
+            b"active": self._send_active_response,
+            b"help": self._send_help_response,
+            b"admin": self._send_admin_response,
+        }
+        self._admin_callbacks = frozenset({b"admin"})  # Кнопки, доступные только администраторам
         self.price_cache = PriceCache(ttl=5)  # Кэш цен
+        # Telegram ограничивает бота ~30 сообщениями в секунду - держим запас
+        self._send_semaphore = asyncio.Semaphore(25)
+        self._parser_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="parser")  # Парсинг вне цикла событий
 
         # Конфигурация
         self.partial_signals_ttl = 300  # 5 минут TTL для неполных сигналов
@@ -203,27 +503,85 @@ class TelethonTradingBot:
         self.restart_attempts = 0
         self.max_restart_attempts = 3
 
+        self.symbols_refresh_interval = 6 * 3600  # Обновление списков символов бирж
+        self.monitor_interval = 5  # Интервал опроса цен, если поток не прислал обновление раньше
+        self.max_price_failure_time = 50  # секунд без цены, после которых сигнал снимается
+        self.price_timeout = 5  # секунд ждем цену символа на тике, дальше запрос догружается к следующему
+        self._price_failures: Dict[int, float] = {}  # ID сигнала -> время первой неудачной попытки
+        # Обновления веб-интерфейса за тик мониторинга (сбрасываются одним bulk_update)
+        self._signal_updates: List[tuple] = []
+        self._web_signals: Dict[int, SignalData] = {}  # ID сигнала -> снимок для веб-интерфейса
+        self._price_updates: Dict[str, Dict[str, Any]] = {}
+
         # Запускаем фоновые задачи
         asyncio.create_task(self._cleanup_tasks())
-    def _setup_telethon_error_handler(self):
-        """Настраивает обработчик ошибок Telethon"""
-        try:
-            loop = asyncio.get_event_loop()
+        asyncio.create_task(self._refresh_symbols())
+        asyncio.create_task(self._monitor_signals())
+
+    def _add_active_signal(self, signal) -> int:
+        """Регистрирует сигнал как активный (с этого момента его ведет цикл мониторинга) и возвращает его ID"""
+        signal_id = next(self._signal_counter)
+
+        # Тейки упорядочиваем по ходу сделки: на каждом тике проверяем только следующий
+        signal.take_profits = _sort_take_profits(signal, signal.take_profits)
+
+        self.active_signals[signal_id] = signal
+        self._signals_by_symbol.setdefault(signal.symbol, []).append(signal_id)
+        logger.info("🔍 Начинаем мониторинг %s %s", signal.symbol, signal.direction)
+        return signal_id
+
+    @staticmethod
+    def _set_take_profits(signal, values: List[float], current_price: Optional[float]):
+        """Заменяет тейки сигнала; тейки, которые цена уже прошла, сразу считаются достигнутыми"""
+        take_profits = _sort_take_profits(signal, values)
+        next_tp = 0
+        if current_price is not None:
+            sign = 1.0 if signal.direction == "LONG" else -1.0  # SHORT зарабатывает на падении цены
+            while next_tp < len(take_profits) and sign * (current_price - take_profits[next_tp]) >= 0:
+                next_tp += 1
+        signal.take_profits = take_profits
+        signal.next_tp = next_tp
+
+    def _remove_active_signal(self, signal_id: int):
+        """Удаляет сигнал из активных и из индекса по символам"""
+        signal = self.active_signals.pop(signal_id, None)
+        self._price_failures.pop(signal_id, None)
+        self._web_signals.pop(signal_id, None)
+        if signal is None:
+            return
 
-            def exception_handler(loop, context):
-                exception = context.get('exception')
-                if isinstance(exception, TypeNotFoundError):
-                    logger.warning(f"⚠️  Telethon TypeNotFoundError: {exception}")
-                    logger.info("🔄 Игнорируем ошибку и продолжаем работу...")
-                    return
+        ids = self._signals_by_symbol.get(signal.symbol)
+        if ids and signal_id in ids:
+            ids.remove(signal_id)
+            if not ids:
+                del self._signals_by_symbol[signal.symbol]
+
+    @staticmethod
+    def _handle_loop_exception(loop, context):
+        """Обработчик необработанных ошибок цикла событий: TypeNotFoundError Telethon не считаем фатальной"""
+        exception = context.get('exception')
+        if isinstance(exception, TypeNotFoundError):
+            logger.warning("⚠️  Telethon TypeNotFoundError: %s", exception)
+            logger.info("🔄 Игнорируем ошибку и продолжаем работу...")
+            return
 
-                # Для других ошибок - стандартная обработка
-                if loop.default_exception_handler:
-                    loop.default_exception_handler(context)
+        # Для других ошибок - стандартная обработка
+        loop.default_exception_handler(context)
 
-            loop.set_exception_handler(exception_handler)
-        except Exception as e:
-            logger.error(f"❌ Ошибка настройки обработчика ошибок: {e}")
+    def _touch_user_state(self, user_id: int, create: bool = False) -> Optional[UserState]:
+        """Отмечает активность пользователя и переносит его состояние в конец очереди"""
+        state = self.user_states.get(user_id)
+        if state is None:
+            if not create:
+                return None
+            state = self.user_states[user_id] = UserState()
+            # Жесткий лимит: вытесняем самые давние состояния
+            while len(self.user_states) > self.max_user_states:
+                self.user_states.popitem(last=False)
+        else:
+            self.user_states.move_to_end(user_id)
+            state.last_activity = time.monotonic()
+        return state
 
     async def _cleanup_tasks(self):
         """Фоновая задача для очистки старых данных"""
@@ -232,24 +590,58 @@ class TelethonTradingBot:
                 # Очищаем старые кэшированные цены
                 self.price_cache.clear_old_entries()
 
+                # Перечитываем права доступа: users.json могли изменить вне бота
+                clear_access_cache()
+
                 # Очищаем устаревшие частичные сигналы Хрусталева
                 await self.clean_old_khrustalev_signals()
 
                 # Очищаем устаревшие состояния пользователей (старше 1 часа)
-                current_time = time.time()
-                users_to_remove = []
-                for user_id, state in self.user_states.items():
-                    if hasattr(state, 'last_activity') and current_time - state.last_activity > 3600:
-                        users_to_remove.append(user_id)
-
-                for user_id in users_to_remove:
+                # (с начала до первого активного - дальше только более свежие)
+                current_time = time.monotonic()
+                while self.user_states:
+                    user_id, state = next(iter(self.user_states.items()))
+                    if current_time - state.last_activity <= 3600:
+                        break
                     del self.user_states[user_id]
 
                 await asyncio.sleep(60)  # Запускаем каждую минуту
             except Exception as e:
-                logger.error(f"❌ Ошибка в задаче очистки: {e}")
+                logger.error("❌ Ошибка в задаче очистки: %s", e)
                 await asyncio.sleep(60)
 
+    async def _refresh_symbols(self):
+        """Фоновая задача: держит в памяти списки символов бирж"""
+        while True:
+            try:
+                await multi_exchange.refresh_symbols()
+            except Exception as e:
+                logger.error("❌ Ошибка обновления списков символов: %s", e)
+            await asyncio.sleep(self.symbols_refresh_interval)
+
+    async def _dispatch_message(self, event):
+        """Направляет сообщение из мониторируемого канала в обработчик сигналов, команды - по таблице команд,
+        остальной текст - в обработчик кнопок и ввода сделки"""
+        if event.chat_id in self._monitored_chat_ids:
+            await self.handle_channel_message(event)
+            return
+
+        # Команды и кнопки работают только в личке - сообщения групп отбрасываем до разбора текста
+        if not event.is_private:
+            return
+
+        text = event.raw_text or ''
+        if text.startswith('/'):
+            # "/editsignal 12 ..." или "/start@bot_name" -> "/editsignal", "/start"
+            command = text.split(None, 1)[0].split('@', 1)[0].lower()
+            handler = self._command_handlers.get(command)
+            if handler:
+                await handler(event)
+            # Команда (в том числе неизвестная) не должна второй раз читаться как ввод сделки или кнопка
+            return
+
+        await self.handle_text_messages(event)
+
     async def handle_channel_message(self, event):
         """Обрабатывает сообщения из каналов с фильтрацией предварительных объявлений"""
         try:
@@ -267,29 +659,41 @@ class TelethonTradingBot:
             if not message_text:
                 return
 
-            logger.info(f"📨 Сообщение из '{channel_name}': {message_text[:100]}...")
+            logger.info("📨 Сообщение из '%s': %.100s...", channel_name, message_text)
 
             # Для Хрусталева используем специальный обработчик
-            if "khrustalev" in channel_name.lower():
+            if chat_id in self._khrustalev_chat_ids:
                 await self.handle_khrustalev_message(message_text, channel_name, event)
                 return
 
             # Проверяем лимит активных сигналов
             if len(self.active_signals) >= self.max_active_signals:
-                logger.warning(f"⚠️  Достигнут лимит активных сигналов ({self.max_active_signals})")
+                logger.warning("⚠️  Достигнут лимит активных сигналов (%s)", self.max_active_signals)
+                return
+
+            # Префильтр: без конкретных торговых данных сообщение не станет сигналом,
+            # поэтому отсекаем его одним проходом регулярки еще до разбора парсером
+            if not self.has_concrete_trading_data(message_text):
+                logger.info("🔕 Пропускаем - нет конкретных торговых данных")
                 return
 
-            # Парсим сигнал
-            signal = advanced_parser.parse_signal(message_text, channel_name)
+            # Без латинских букв тикер не распознать - не тратим время на парсер
+            if not _SYMBOL_PREFILTER.search(message_text):
+                logger.warning("⚠️  Символ не распознан, пропускаем сообщение")
+                return
+
+            # Парсим сигнал в отдельном потоке, чтобы тяжелые регулярки не блокировали мониторы
+            signal = await asyncio.get_running_loop().run_in_executor(
+                self._parser_pool, advanced_parser.parse_signal, message_text, channel_name)
 
             # Если символ не распознан, пропускаем
             if signal.symbol == "UNKNOWN":
-                logger.warning(f"⚠️  Символ не распознан, пропускаем сообщение")
+                logger.warning("⚠️  Символ не распознан, пропускаем сообщение")
                 return
 
             # 🔥 ФИЛЬТРАЦИЯ: Проверяем, что это полноценный торговый сигнал, а не предварительное объявление
             if not self.is_valid_trading_signal(signal, message_text):
-                logger.info(f"🔕 Пропускаем предварительное объявление для {signal.symbol} - недостаточно данных")
+                logger.info("🔕 Пропускаем предварительное объявление для %s - недостаточно данных", signal.symbol)
                 return
 
             # 🔥 УНИВЕРСАЛЬНОЕ ПРАВИЛО: ЕСЛИ НЕТ ЦЕНЫ ВХОДА → СЧИТАЕМ РЫНОЧНЫМ
@@ -299,117 +703,76 @@ class TelethonTradingBot:
             )
 
             if is_market_condition and signal.take_profits:
-                logger.info(f"🎯 Сигнал {signal.symbol} без цены входа → считаем рыночным")
+                logger.info("🎯 Сигнал %s без цены входа → считаем рыночным", signal.symbol)
                 signal.is_market = True  # Устанавливаем флаг
 
                 # Получаем текущую цену
-                try:
-                    current_price, exchange_used = await self.price_cache.get_price(signal.symbol)
+                current_price, exchange_used = await self.price_cache.get_price(signal.symbol)
+
+                # Проверяем, не является ли ошибка критической (event loop closed)
+                if exchange_used == "Event loop closed":
+                    logger.critical("❌ КРИТИЧЕСКАЯ ОШИБКА: Цикл событий закрыт. Требуется перезапуск бота.")
+                    self.event_loop_closed = True
+
+                    # Пытаемся перезапустить цикл событий
+                    await self._handle_event_loop_error()
+                    return
+
+                if current_price:
+                    signal.entry_prices = [current_price]
+                    logger.info("💰 Рыночный вход - текущая цена %s: %s (биржа: %s)",
+                                signal.symbol, current_price, exchange_used)
+                else:
+                    logger.warning("⚠️  Не удалось получить цену для %s, пробуем альтернативный символ...",
+                                   signal.symbol)
+
+                    # Пробуем альтернативный формат (например, BCH вместо BCHUSDT)
+                    alt_symbol = signal.symbol.replace("USDT", "")
+                    current_price, exchange_used = await self.price_cache.get_price(alt_symbol)
 
                     # Проверяем, не является ли ошибка критической (event loop closed)
                     if exchange_used == "Event loop closed":
-                        logger.critical(f"❌ КРИТИЧЕСКАЯ ОШИБКА: Цикл событий закрыт. Требуется перезапуск бота.")
+                        logger.critical("❌ КРИТИЧЕСКАЯ ОШИБКА: Цикл событий закрыт. Требуется перезапуск бота.")
                         self.event_loop_closed = True
-
-                        # Пытаемся перезапустить цикл событий
                         await self._handle_event_loop_error()
                         return
 
                     if current_price:
                         signal.entry_prices = [current_price]
-                        logger.info(
-                            f"💰 Рыночный вход - текущая цена {signal.symbol}: {current_price} (биржа: {exchange_used})")
+                        logger.info("💰 Рыночный вход - альтернативная цена %s: %s", alt_symbol, current_price)
                     else:
-                        logger.warning(
-                            f"⚠️  Не удалось получить цену для {signal.symbol}, пробуем альтернативный символ...")
-
-                        # Пробуем альтернативный формат (например, BCH вместо BCHUSDT)
-                        alt_symbol = signal.symbol.replace("USDT", "")
-                        current_price, exchange_used = await self.price_cache.get_price(alt_symbol)
-
-                        # Проверяем, не является ли ошибка критической (event loop closed)
-                        if exchange_used == "Event loop closed":
-                            logger.critical(f"❌ КРИТИЧЕСКАЯ ОШИБКА: Цикл событий закрыт. Требуется перезапуск бота.")
-                            self.event_loop_closed = True
-                            await self._handle_event_loop_error()
-                            return
-
-                        if current_price:
-                            signal.entry_prices = [current_price]
-                            logger.info(f"💰 Рыночный вход - альтернативная цена {alt_symbol}: {current_price}")
-                        else:
-                            logger.warning(f"⚠️  Не удалось получить цену для {signal.symbol}, пропускаем сигнал")
-                            return
-
-                except RuntimeError as e:
-                    if "Event loop is closed" in str(e) or "no running event loop" in str(e):
-                        logger.critical(f"❌ КРИТИЧЕСКАЯ ОШИБКА RUNTIME: {e}")
-                        self.event_loop_closed = True
-                        await self._handle_event_loop_error()
+                        logger.warning("⚠️  Не удалось получить цену для %s, пропускаем сигнал", signal.symbol)
                         return
-                    else:
-                        raise
 
             # 🔥 КРИТИЧЕСКАЯ ПРОВЕРКА: Если после всех манипуляций все еще нет цены входа → пропускаем
             elif not signal.entry_prices and not signal.limit_prices:
-                logger.info(f"🔕 Пропускаем сигнал {signal.symbol} - не удалось определить цену входа")
+                logger.info("🔕 Пропускаем сигнал %s - не удалось определить цену входа", signal.symbol)
                 return
 
             # Сохраняем сигнал в активные
-            signal_id = f"{signal.symbol}_{int(signal.timestamp)}"
-            self.active_signals[signal_id] = signal
+            signal_id = self._add_active_signal(signal)
 
             # Сохраняем сигнал в trading_data для веб-интерфейса
-            signal_data = {
-                'signal_id': signal_id,
-                'symbol': signal.symbol,
-                'direction': signal.direction,
-                'entry_prices': signal.entry_prices,
-                'limit_prices': signal.limit_prices,
-                'take_profits': signal.take_profits,
-                'stop_loss': signal.stop_loss,
-                'leverage': signal.leverage,
-                'margin': signal.margin,
-                'source': signal.source,
-                'pnl_percent': 0,
-                'reached_tps': [],
-                'exchange': 'Unknown',
-                'timestamp': signal.timestamp,
-                'is_market': signal.is_market
-            }
+            signal_data = SignalData.from_signal(signal_id, signal)
             trading_data.update_signal_data(signal_data)
-            logger.info(f"💾 Сигнал сохранен в trading_data: {signal.symbol}")
+            logger.info("💾 Сигнал сохранен в trading_data: %s", signal.symbol)
 
             # Логируем успешный парсинг
-            logger.info(f"✅ СИГНАЛ РАСПОЗНАН:")
-            logger.info(f"   Символ: {signal.symbol}")
-            logger.info(f"   Направление: {signal.direction}")
-            logger.info(f"   Входы: {signal.entry_prices}")
-            logger.info(f"   Лимитные входы: {signal.limit_prices}")
-            logger.info(f"   Тейки: {signal.take_profits}")
-            logger.info(f"   Стоп: {signal.stop_loss}")
-            logger.info(f"   Плечо: {signal.leverage}")
-            logger.info(f"   Маржа: {signal.margin}")
-            logger.info(f"   Источник: {signal.source}")
-            logger.info(f"   Рыночный вход: {signal.is_market}")
-            logger.info("-" * 60)
-
-            # Запускаем мониторинг цены для этого сигнала
-            asyncio.create_task(self.monitor_signal(signal_id))
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(_RECOGNIZED_SIGNAL_LOG,
+                            signal.symbol, signal.direction, signal.entry_prices, signal.limit_prices,
+                            signal.take_profits, signal.stop_loss, signal.leverage, signal.margin,
+                            signal.source, signal.is_market)
 
         except RuntimeError as e:
-            if "Event loop is closed" in str(e) or "no running event loop" in str(e):
-                logger.critical(f"❌ КРИТИЧЕСКАЯ ОШИБКА В ОБРАБОТКЕ СООБЩЕНИЯ: {e}")
+            if is_loop_closed_error(e):
+                logger.critical("❌ КРИТИЧЕСКАЯ ОШИБКА В ОБРАБОТКЕ СООБЩЕНИЯ: %s", e)
                 self.event_loop_closed = True
                 await self._handle_event_loop_error()
             else:
-                logger.error(f"❌ RuntimeError обработки сообщения: {e}")
-                import traceback
-                logger.error(traceback.format_exc())
+                logger.exception("❌ RuntimeError обработки сообщения: %s", e)
         except Exception as e:
-            logger.error(f"❌ Ошибка обработки сообщения: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.exception("❌ Ошибка обработки сообщения: %s", e)
 
     async def _handle_event_loop_error(self):
         """Обрабатывает критическую ошибку event loop closed"""
@@ -434,7 +797,7 @@ class TelethonTradingBot:
             self.event_loop_closed = False
             logger.info("✅ Цикл событий восстановлен")
         except Exception as e:
-            logger.critical(f"❌ Не удалось восстановить цикл событий: {e}")
+            logger.critical("❌ Не удалось восстановить цикл событий: %s", e)
             await self._notify_admin_critical_error()
             raise
 
@@ -448,19 +811,12 @@ class TelethonTradingBot:
         except:
             pass
 
-        # 2. Создаем новый event loop если нужно
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_closed():
-                logger.info("🔄 Текущий цикл событий закрыт, создаем новый...")
-                asyncio.set_event_loop(asyncio.new_event_loop())
-        except:
-            asyncio.set_event_loop(asyncio.new_event_loop())
-
-        # 3. Пересоздаем кэш цен
+        # 2. Пересоздаем кэш цен
+        # (новый цикл событий здесь не создаем: корутина выполняется в работающем цикле,
+        # а подмена цикла через set_event_loop на него не влияет)
         self.price_cache = PriceCache(ttl=5)
 
-        # 4. Пауза перед продолжением
+        # 3. Пауза перед продолжением
         await asyncio.sleep(2)
 
         logger.info("✅ Критические компоненты перезапущены")
@@ -468,88 +824,77 @@ class TelethonTradingBot:
     async def _notify_admin_critical_error(self):
         """Отправляет уведомление админу о критической ошибке"""
         try:
-            for admin_id in ADMINS:
-                try:
-                    await self.client.send_message(
-                        admin_id,
-                        f"🚨 **КРИТИЧЕСКАЯ ОШИБКА БОТА**\n\n"
-                        f"Обнаружена ошибка 'Event loop closed'.\n"
-                        f"Попыток перезапуска: {self.restart_attempts}/{self.max_restart_attempts}\n"
-                        f"Требуется ручное вмешательство!\n\n"
-                        f"Время: {time.strftime('%Y-%m-%d %H:%M:%S')}"
-                    )
-                except:
-                    pass
+            text = (
+                f"🚨 **КРИТИЧЕСКАЯ ОШИБКА БОТА**\n\n"
+                f"Обнаружена ошибка 'Event loop closed'.\n"
+                f"Попыток перезапуска: {self.restart_attempts}/{self.max_restart_attempts}\n"
+                f"Требуется ручное вмешательство!\n\n"
+                f"Время: {time.strftime('%Y-%m-%d %H:%M:%S')}"
+            )
+            # Всем админам параллельно; ошибки доставки отдельным админам игнорируем
+            await self._broadcast(ADMINS, text)
         except:
             pass
 
+    async def _broadcast(self, user_ids, text: str):
+        """Рассылает сообщение параллельно, не превышая лимит Telegram на одновременные отправки"""
+
+        async def send(user_id):
+            async with self._send_semaphore:
+                return await self.client.send_message(user_id, text)
+
+        return await asyncio.gather(*map(send, user_ids), return_exceptions=True)
+
     def is_valid_trading_signal(self, signal, message_text: str) -> bool:
         """Проверяет, является ли сообщение полноценным торговым сигналом - УЛУЧШЕННАЯ ВЕРСИЯ"""
 
         # 1. Символ не должен быть UNKNOWN
         if signal.symbol == "UNKNOWN":
-            logger.info(f"🔕 Пропускаем - символ не распознан")
+            logger.info("🔕 Пропускаем - символ не распознан")
             return False
 
         # 2. Направление должно быть определено (LONG/SHORT)
         if signal.direction == "UNKNOWN":
-            logger.info(f"🔕 Пропускаем - направление не распознано")
+            logger.info("🔕 Пропускаем - направление не распознано")
             return False
 
         # 3. Должны быть указаны тейк-профиты (если нет тейков - это предварительное объявление)
         has_take_profits = bool(signal.take_profits)
         if not has_take_profits:
-            logger.info(f"🔕 Пропускаем - нет тейк-профитов (вероятно предварительное объявление)")
+            logger.info("🔕 Пропускаем - нет тейк-профитов (вероятно предварительное объявление)")
             return False
 
-        # 4. Проверяем конкретные данные в сообщении
-        has_concrete_data = self.has_concrete_trading_data(message_text)
-        if not has_concrete_data:
-            logger.info(f"🔕 Пропускаем - нет конкретных торговых данных")
-            return False
+        # 4. Конкретные данные в сообщении проверяются префильтром до парсинга (has_concrete_trading_data)
 
-        logger.info(f"✅ Сигнал {signal.symbol} прошел все проверки")
+        logger.info("✅ Сигнал %s прошел все проверки", signal.symbol)
         return True
 
     def has_concrete_trading_data(self, message_text: str) -> bool:
         """Проверяет, содержит ли сообщение конкретные торговые данные"""
         # Ищем конкретные числовые паттерны, указывающие на торговые инструкции
-        concrete_patterns = [
-            r'\d+[.,]\d+\s*\$',  # Цены с долларом: 0.48$, 3$
-            r'[TТ][PП]\d*\s*:?\s*\d+[.,]\d+',  # TP1: 0.48, ТП2: 0.58
-            r'тейк\s*профит',  # Упоминание тейк-профитов
-            r'стоп\s*лосс',  # Упоминание стоп-лосса
-            r'вход\s*:?\s*\d+[.,]\d+',  # Вход: 0.9
-            r'добор\s*\d+[.,]\d+',  # Добор 0.78
-            r'лимитный\s*ордер',  # Лимитный ордер
-            r'маржа\s*\d+',  # Маржа 0.3%
-            r'фикс\s*\d+%',  # Фикс 20% объема
-        ]
-
-        clean_text = message_text.lower().replace(' ', '')
-
-        for pattern in concrete_patterns:
-            if re.search(pattern, message_text, re.IGNORECASE):
-                return True
+        if _CONCRETE_UNION.search(message_text):
+            return True
 
         # Дополнительная проверка: должно быть достаточно чисел для торговли
-        numbers = re.findall(r'\d+[.,]\d+', message_text)
-        if len(numbers) >= 3:  # Если есть хотя бы 3 числа (вход + тейки/стоп)
-            return True
+        # (хотя бы 3 числа: вход + тейки/стоп), дальше третьего не ищем
+        for count, _ in enumerate(_NUM_RE.finditer(message_text), 1):
+            if count >= 3:
+                return True
 
         return False
 
     async def handle_khrustalev_message(self, text: str, source: str, event):
         """Обработка сообщений от Хрусталева с временным окном 3 минуты"""
         try:
-            # Парсим сообщение
-            signal = advanced_parser.parse_khrustalev(text, source)
-            current_time = time.time()
+            # Парсим сообщение (как и остальные каналы - в пуле потоков)
+            signal = await asyncio.get_running_loop().run_in_executor(
+                self._parser_pool, parse_khrustalev, text, source)
+            current_time = time.monotonic()
 
-            logger.info(f"🔧 Обработка Хрусталева: символ={signal.symbol}, тейков={len(signal.take_profits)}")
+            logger.info("🔧 Обработка Хрусталева: символ=%s, тейков=%s", signal.symbol, len(signal.take_profits))
 
             # Очищаем устаревшие частичные сигналы
-            await self.clean_old_khrustalev_signals()
+            await self.clean_old_khrustalev_signals(current_time)
 
             # Если это сообщение с символом и входом (первое сообщение)
             if signal.symbol != "UNKNOWN" and signal.entry_prices:
@@ -559,79 +904,58 @@ class TelethonTradingBot:
                     'timestamp': current_time,
                     'first_message': text
                 }
-                logger.info(f"💾 Сохранено первое сообщение Хрусталева: {signal.symbol}")
+                # Повторный сигнал по тому же символу переносим в конец - порядок остается хронологическим
+                self.partial_khrustalev_signals.move_to_end(signal_id)
+                logger.info("💾 Сохранено первое сообщение Хрусталева: %s", signal.symbol)
                 return
 
             # Если это сообщение с целями (второе сообщение)
             elif signal.take_profits and not signal.entry_prices:
                 logger.info("🔍 Поиск частичного сигнала для целей Хрусталева...")
 
-                # Ищем самый свежий частичный сигнал (последний добавленный)
+                # Самый свежий частичный сигнал - последний добавленный
                 latest_signal_id = None
                 latest_timestamp = 0
 
-                for signal_id, data in self.partial_khrustalev_signals.items():
-                    if data['timestamp'] > latest_timestamp:
-                        latest_timestamp = data['timestamp']
-                        latest_signal_id = signal_id
+                if self.partial_khrustalev_signals:
+                    latest_signal_id = next(reversed(self.partial_khrustalev_signals))
+                    latest_timestamp = self.partial_khrustalev_signals[latest_signal_id]['timestamp']
 
                 if latest_signal_id and (current_time - latest_timestamp) <= self.khrustalev_timeout:
                     # Нашли свежий частичный сигнал в пределах 3 минут
                     partial_data = self.partial_khrustalev_signals[latest_signal_id]
                     first_signal = partial_data['signal']
 
-                    logger.info(f"🔗 Объединяем с сигналом: {first_signal.symbol} " +
-                                f"(возраст: {current_time - latest_timestamp:.1f} сек)")
+                    logger.info("🔗 Объединяем с сигналом: %s (возраст: %.1f сек)",
+                                first_signal.symbol, current_time - latest_timestamp)
 
                     # Объединяем сигналы
                     merged_signal = self.merge_khrustalev_signals(first_signal, signal)
 
                     # Проверяем лимит активных сигналов
                     if len(self.active_signals) >= self.max_active_signals:
-                        logger.warning(f"⚠️  Достигнут лимит активных сигналов, пропускаем {merged_signal.symbol}")
+                        logger.warning("⚠️  Достигнут лимит активных сигналов, пропускаем %s", merged_signal.symbol)
                         return
 
                     # Создаем финальный сигнал
-                    final_signal_id = f"{merged_signal.symbol}_{int(time.time())}"
-                    self.active_signals[final_signal_id] = merged_signal
+                    final_signal_id = self._add_active_signal(merged_signal)
 
                     # Удаляем из частичных
                     del self.partial_khrustalev_signals[latest_signal_id]
 
                     # Сохраняем в trading_data
-                    signal_data = {
-                        'signal_id': final_signal_id,
-                        'symbol': merged_signal.symbol,
-                        'direction': merged_signal.direction,
-                        'entry_prices': merged_signal.entry_prices,
-                        'limit_prices': merged_signal.limit_prices,
-                        'take_profits': merged_signal.take_profits,
-                        'stop_loss': merged_signal.stop_loss,
-                        'leverage': merged_signal.leverage,
-                        'margin': merged_signal.margin,
-                        'source': merged_signal.source,
-                        'pnl_percent': 0,
-                        'reached_tps': [],
-                        'exchange': 'Unknown',
-                        'timestamp': merged_signal.timestamp
-                    }
+                    signal_data = SignalData.from_signal(final_signal_id, merged_signal)
                     trading_data.update_signal_data(signal_data)
 
-                    logger.info(f"✅ ОБЪЕДИНЕННЫЙ СИГНАЛ ХРУСТАЛЕВА:")
-                    logger.info(f"   Символ: {merged_signal.symbol}")
-                    logger.info(f"   Направление: {merged_signal.direction}")
-                    logger.info(f"   Вход: {merged_signal.entry_prices}")
-                    logger.info(f"   Тейки: {merged_signal.take_profits}")
-                    logger.info(f"   Стоп: {merged_signal.stop_loss}")
-                    logger.info("-" * 60)
-
-                    # Запускаем мониторинг
-                    asyncio.create_task(self.monitor_signal(final_signal_id))
+                    logger.info(_KHRUSTALEV_MERGED_LOG,
+                                merged_signal.symbol, merged_signal.direction, merged_signal.entry_prices,
+                                merged_signal.take_profits, merged_signal.stop_loss)
 
                 else:
                     if latest_signal_id:
                         logger.warning(
-                            f"⚠️  Сигнал устарел: {current_time - latest_timestamp:.1f} сек > {self.khrustalev_timeout} сек")
+                            "⚠️  Сигнал устарел: %.1f сек > %s сек",
+                            current_time - latest_timestamp, self.khrustalev_timeout)
                     else:
                         logger.warning("⚠️  Не найдено частичных сигналов для объединения")
 
@@ -639,25 +963,25 @@ class TelethonTradingBot:
                 logger.warning("⚠️  Непонятный формат сообщения Хрусталева")
 
         except Exception as e:
-            logger.error(f"❌ Ошибка обработки сообщения Хрусталева: {e}")
+            logger.error("❌ Ошибка обработки сообщения Хрусталева: %s", e)
 
-    async def clean_old_khrustalev_signals(self):
-        """Очищает устаревшие частичные сигналы Хрусталева"""
-        current_time = time.time()
-        expired_signals = []
+    async def clean_old_khrustalev_signals(self, current_time: Optional[float] = None):
+        """Очищает устаревшие частичные сигналы Хрусталева (current_time - по time.monotonic)"""
+        if current_time is None:
+            current_time = time.monotonic()
 
-        for signal_id, data in self.partial_khrustalev_signals.items():
-            if current_time - data['timestamp'] > self.khrustalev_timeout:
-                expired_signals.append(signal_id)
+        # Сигналы упорядочены по времени: снимаем устаревшие с начала до первого свежего
+        while self.partial_khrustalev_signals:
+            signal_id, data = next(iter(self.partial_khrustalev_signals.items()))
+            if current_time - data['timestamp'] <= self.khrustalev_timeout:
+                break
 
-        for signal_id in expired_signals:
-            symbol = self.partial_khrustalev_signals[signal_id]['signal'].symbol
             del self.partial_khrustalev_signals[signal_id]
-            logger.info(f"🧹 Удален устаревший частичный сигнал Хрусталева: {symbol}")
+            logger.info("🧹 Удален устаревший частичный сигнал Хрусталева: %s", data['signal'].symbol)
 
     def merge_khrustalev_signals(self, first_signal, second_signal):
         """Объединяет два сигнала Хрусталева"""
-        merged = advanced_parser.TradeSignal()
+        merged = TradeSignal()
 
         # Берем основные данные из первого сообщения
         merged.symbol = first_signal.symbol
@@ -665,6 +989,7 @@ class TelethonTradingBot:
         merged.entry_prices = first_signal.entry_prices
         merged.source = first_signal.source
         merged.timestamp = first_signal.timestamp
+        merged.monotonic_start = first_signal.monotonic_start
 
         # Добавляем данные из второго сообщения
         merged.take_profits = second_signal.take_profits
@@ -690,37 +1015,30 @@ class TelethonTradingBot:
 
     async def start(self):
         """Запускает бота"""
+        # Обработчик ставим на тот цикл событий, в котором бот реально работает
+        asyncio.get_running_loop().set_exception_handler(self._handle_loop_exception)
+
         await self.client.start(bot_token=BOT_TOKEN)
         logger.info("✅ Telethon бот запущен")
 
-        # Регистрируем обработчики команд
-        self.client.add_event_handler(self.handle_start_command, events.NewMessage(pattern='/start'))
-        self.client.add_event_handler(self.handle_dashboard_command, events.NewMessage(pattern='/dashboard'))
-        self.client.add_event_handler(self.handle_stats_command, events.NewMessage(pattern='/stats'))
-        self.client.add_event_handler(self.handle_active_command, events.NewMessage(pattern='/active'))
-        self.client.add_event_handler(self.handle_help_command, events.NewMessage(pattern='/help'))
-
-        # Админские команды
-        self.client.add_event_handler(self.handle_admin_command, events.NewMessage(pattern='/admin'))
-        self.client.add_event_handler(self.handle_admin_help_command, events.NewMessage(pattern='/adminhelp'))
-        self.client.add_event_handler(self.handle_add_user_command, events.NewMessage(pattern='/adduser'))
-        self.client.add_event_handler(self.handle_remove_user_command, events.NewMessage(pattern='/removeuser'))
-        self.client.add_event_handler(self.handle_list_users_command, events.NewMessage(pattern='/listusers'))
-        self.client.add_event_handler(self.handle_edit_signal_command, events.NewMessage(pattern='/editsignal'))
-        self.client.add_event_handler(self.handle_add_signal_command, events.NewMessage(pattern='/addsignal'))
-        self.client.add_event_handler(self.handle_active_signals_command,
-                                      events.NewMessage(pattern='/activesignals'))
-
-        # Обработчик текстовых сообщений (кнопки)
-        self.client.add_event_handler(self.handle_text_messages, events.NewMessage)
+        # Поток цен Binance; REST остается запасным вариантом в PriceCache
+        price_tracker.start()
+
+        # Один обработчик на все сообщения: каналы, команды и текстовые кнопки разводим сами,
+        # чтобы сообщение не проходило цепочку фильтров Telethon по разу на каждую команду
+        self._monitored_chat_ids = frozenset([await self.client.get_peer_id(chat) for chat in MONITORED_CHANNELS])
+        # Прогреваем кеш источников, чтобы и первое сообщение канала не шло в конфиг,
+        # и сразу запоминаем каналы Хрусталева - у них свой обработчик
+        self._khrustalev_chat_ids = frozenset(
+            chat_id for chat_id in self._monitored_chat_ids
+            if "khrustalev" in get_channel_source(chat_id).lower()
+        )
+        self.client.add_event_handler(self._dispatch_message, events.NewMessage)
 
         # Обработчик inline кнопок
         self.client.add_event_handler(self.handle_callback_query, events.CallbackQuery)
 
-        # Обработчик для всех сообщений из мониторируемых каналов
-        self.client.add_event_handler(self.handle_channel_message, events.NewMessage(chats=MONITORED_CHANNELS))
-
-        logger.info(f"🔍 Мониторим каналы: {MONITORED_CHANNELS}")
+        logger.info("🔍 Мониторим каналы: %s", MONITORED_CHANNELS)
         await self.client.run_until_disconnected()
 
     def create_web_app_button(self, text, url):
@@ -790,29 +1108,52 @@ class TelethonTradingBot:
             await event.answer("❌ Доступ запрещен")
             return
 
-        data = event.data.decode('utf-8') if event.data else ''
+        # Кнопки создаются с bytes-данными, поэтому сравниваем bytes без декодирования
+        data = event.data or b''
 
-        try:
-            if data == "stats":
-                await self._send_stats_response(event)
-            elif data == "active":
-                await self._send_active_response(event)
-            elif data == "help":
-                await self._send_help_response(event)
-            elif data == "admin":
-                if is_admin(event.sender_id):
-                    await self._send_admin_response(event)
-                else:
-                    await event.answer("❌ Доступ запрещен", alert=True)
-            else:
-                await event.answer(f"❌ Неизвестная команда: {data}")
+        handler = self._callback_handlers.get(data)
+        if handler is None:
+            await event.answer(f"❌ Неизвестная команда: {data.decode('utf-8', 'replace')}")
+            return
+        if data in self._admin_callbacks and not is_admin(event.sender_id):
+            await event.answer("❌ Доступ запрещен", alert=True)
+            return
 
-            # Подтверждаем нажатие кнопки
-            await event.answer()
+        # Подтверждаем нажатие сразу: сборка ответа не должна упираться в дедлайн Telegram на answer
+        await event.answer()
 
+        try:
+            await handler(event)
         except Exception as e:
-            logger.error(f"❌ Ошибка обработки callback: {e}")
-            await event.answer("❌ Произошла ошибка", alert=True)
+            logger.error("❌ Ошибка обработки callback: %s", e)
+            # Callback уже подтвержден, поэтому об ошибке сообщаем отдельным сообщением
+            await event.respond("❌ Произошла ошибка")
+
+    @staticmethod
+    def _format_card(template: str, signal_id: int, signal, pnl: float, current_price: Any = 'N/A') -> str:
+        """Заполняет шаблон карточки сделки"""
+        return template.format(
+            direction_emoji="🟢" if signal.direction == "LONG" else "🔴",
+            symbol=signal.symbol,
+            direction=signal.direction,
+            signal_id=signal_id,
+            current_price=current_price,
+            pnl_emoji="📈" if pnl > 0 else "📉",
+            pnl=pnl,
+            tp_count=len(signal.take_profits),
+            source=signal.source
+        )
+
+    def _active_cards(self, template: str, limit: int) -> str:
+        """Карточки первых limit активных сделок с текущей ценой и PnL"""
+        cards = []
+        symbols_data = {}
+        for signal_id, signal in itertools.islice(self.active_signals.items(), limit):
+            symbol_data = _cached_symbol_data(symbols_data, signal.symbol)
+            current_price = symbol_data.get('current_price', 'N/A') if symbol_data else 'N/A'
+            pnl = symbol_data.get('pnl_percent', 0) if symbol_data else 0
+            cards.append(self._format_card(template, signal_id, signal, pnl, current_price))
+        return ''.join(cards)
 
     async def _send_stats_response(self, event):
         """Отправляет статистику в ответ на callback"""
@@ -821,23 +1162,20 @@ class TelethonTradingBot:
             return
 
         stats_text = "📊 **Статистика сделок**\n\n"
-        total_pnl = 0
-        signals_with_pnl = 0
+        pnls = []
+        cards = []
+        symbols_data = {}
 
-        for signal_id, signal in list(self.active_signals.items())[:5]:
-            symbol_data = trading_data.get_symbol_data(signal.symbol)
+        for signal_id, signal in itertools.islice(self.active_signals.items(), 5):
+            symbol_data = _cached_symbol_data(symbols_data, signal.symbol)
             if symbol_data and 'pnl_percent' in symbol_data:
                 pnl = symbol_data['pnl_percent']
-                total_pnl += pnl
-                signals_with_pnl += 1
-
-                direction_emoji = "🟢" if signal.direction == "LONG" else "🔴"
-                pnl_emoji = "📈" if pnl > 0 else "📉"
+                pnls.append(pnl)
+                cards.append(self._format_card(_STATS_CARD, signal_id, signal, pnl=pnl))
 
-                stats_text += f"{direction_emoji} **{signal.symbol}** {signal.direction}\n"
-                stats_text += f"   {pnl_emoji} PnL: {pnl:+.2f}%\n"
-                stats_text += f"   🎯 Тейков: {len(signal.take_profits)}\n"
-                stats_text += f"   📍 Источник: {signal.source}\n\n"
+        stats_text += ''.join(cards)
+        total_pnl = sum(pnls)
+        signals_with_pnl = len(pnls)
 
         if signals_with_pnl > 0:
             avg_pnl = total_pnl / signals_with_pnl
@@ -855,18 +1193,7 @@ class TelethonTradingBot:
 
         active_text = "🔄 **Активные сделки**\n\n"
 
-        for signal_id, signal in list(self.active_signals.items())[:5]:
-            symbol_data = trading_data.get_symbol_data(signal.symbol)
-            current_price = symbol_data.get('current_price', 'N/A') if symbol_data else 'N/A'
-            pnl = symbol_data.get('pnl_percent', 0) if symbol_data else 0
-
-            direction_emoji = "🟢" if signal.direction == "LONG" else "🔴"
-            pnl_emoji = "📈" if pnl > 0 else "📉"
-
-            active_text += f"{direction_emoji} **{signal.symbol}** {signal.direction}\n"
-            active_text += f"   💰 Цена: {current_price}\n"
-            active_text += f"   {pnl_emoji} PnL: {pnl:+.2f}%\n"
-            active_text += f"   🎯 Тейков: {len(signal.take_profits)}\n\n"
+        active_text += self._active_cards(_ACTIVE_CARD, 5)
 
         if len(self.active_signals) > 5:
             active_text += f"*... и еще {len(self.active_signals) - 5} сделок*"
@@ -875,94 +1202,21 @@ class TelethonTradingBot:
 
     async def _send_help_response(self, event):
         """Отправляет справку в ответ на callback"""
-        help_text = """
-❓ **Помощь по Trading Bot**
-
-**Основные команды:**
-/start - Главное меню
-/dashboard - Открыть веб-интерфейс  
-/stats - Статистика сделок
-/active - Активные сделки
-        """
+        await event.respond(_ADMIN_HELP_TEXT if is_admin(event.sender_id) else _HELP_TEXT)
 
-        # Добавляем админские команды если пользователь админ
-        if is_admin(event.sender_id):
-            help_text += "\n\n**👑 Админ команды:**\n"
-            help_text += "/admin - Админ панель\n"
-            help_text += "/adminhelp - Подробная справка по админ-командам\n"
-            help_text += "/adduser <id> - Добавить пользователя\n"
-            help_text += "/removeuser <id> - Удалить пользователя\n"
-            help_text += "/listusers - Список пользователей\n"
-            help_text += "/editsignal - Редактировать сделку\n"
-            help_text += "/addsignal - Добавить сделку вручную\n"
-            help_text += "/activesignals - Список сделок с ID\n"
-
-        await event.respond(help_text)
+    def _admin_panel_text(self) -> str:
+        """Текст админ панели с текущими счетчиками"""
+        return _ADMIN_PANEL_TEMPLATE.format(
+            admins=len(ADMINS), whitelist=len(WHITELIST), active=len(self.active_signals))
 
     async def _send_admin_response(self, event):
         """Отправляет админ панель в ответ на callback"""
-        admin_text = f"""
-👑 **Админ панель**
-
-**Статистика пользователей:**
-• Админы: {len(ADMINS)}
-• Белый список: {len(WHITELIST)}
-• Активных сделок: {len(self.active_signals)}
-
-**👥 Управление пользователями:**
-`/adduser <user_id>` - Добавить пользователя
-`/removeuser <user_id>` - Удалить пользователя  
-`/listusers` - Список пользователей
-
-**📊 Управление сделками:**
-`/editsignal <signal_id> <param> <value>` - Редактировать сделку
-`/addsignal` - Добавить сделку вручную
-`/activesignals` - Список сделок с ID
-
-**🛠 Другие команды:**
-`/adminhelp` - Подробная справка по командам
-
-**📝 Примеры:**
-`/adduser 123456789`
-`/editsignal BTCUSDT_123456 stop_loss 50000`
-`/editsignal BTCUSDT_123456 take_profits [51000,52000,53000]`
-`/addsignal` - и следуйте инструкциям
-        """
-
-        await event.respond(admin_text)
+        await event.respond(self._admin_panel_text())
 
     @admin_only
     async def handle_admin_command(self, event):
         """Обработчик команды /admin"""
-        admin_text = f"""
-👑 **Админ панель**
-
-**Статистика пользователей:**
-• Админы: {len(ADMINS)}
-• Белый список: {len(WHITELIST)}
-• Активных сделок: {len(self.active_signals)}
-
-**👥 Управление пользователями:**
-`/adduser <user_id>` - Добавить пользователя
-`/removeuser <user_id>` - Удалить пользователя  
-`/listusers` - Список пользователей
-
-**📊 Управление сделками:**
-`/editsignal <signal_id> <param> <value>` - Редактировать сделку
-`/addsignal` - Добавить сделку вручную
-`/activesignals` - Список сделок с ID
-
-**🛠 Другие команды:**
-`/adminhelp` - Подробная справка по командам
-
-**📝 Примеры:**
-`/adduser 123456789`
-`/editsignal BTCUSDT_123456 stop_loss 50000`
-`/editsignal BTCUSDT_123456 take_profits [51000,52000,53000]`
-`/addsignal` - и следуйте инструкциям
-        """
-
-        await event.reply(admin_text)
+        await event.reply(self._admin_panel_text())
 
     @admin_only
     async def handle_add_user_command(self, event):
@@ -997,16 +1251,13 @@ class TelethonTradingBot:
     @admin_only
     async def handle_list_users_command(self, event):
         """Показать список пользователей"""
-        users_text = "👥 **Список пользователей**\n\n"
-        users_text += f"**Админы ({len(ADMINS)}):**\n"
-        for admin_id in ADMINS:
-            users_text += f"• `{admin_id}`\n"
+        # Белый список может быть длинным - собираем строки списком, а не конкатенацией
+        lines = ["👥 **Список пользователей**\n", f"**Админы ({len(ADMINS)}):**"]
+        lines.extend(f"• `{admin_id}`" for admin_id in ADMINS)
+        lines.append(f"\n**Белый список ({len(WHITELIST)}):**")
+        lines.extend(f"• `{user_id}`" for user_id in WHITELIST)
 
-        users_text += f"\n**Белый список ({len(WHITELIST)}):**\n"
-        for user_id in WHITELIST:
-            users_text += f"• `{user_id}`\n"
-
-        await event.reply(users_text)
+        await event.reply("\n".join(lines) + "\n")
 
     @admin_only
     async def handle_edit_signal_command(self, event):
@@ -1017,16 +1268,19 @@ class TelethonTradingBot:
                 "❌ Использование: /editsignal <signal_id> <param> <value>\n\nПараметры: stop_loss, take_profits, entry_prices")
             return
 
-        signal_id = args[1]
+        try:
+            signal_id = int(args[1])
+        except ValueError:
+            await event.reply("❌ ID сделки должен быть числом")
+            return
         param = args[2]
         value_str = ' '.join(args[3:])
 
-        if signal_id not in self.active_signals:
+        signal = self.active_signals.get(signal_id)
+        if signal is None:
             await event.reply("❌ Сделка не найдена")
             return
 
-        signal = self.active_signals[signal_id]
-
         try:
             if param == "stop_loss":
                 new_value = float(value_str)
@@ -1035,19 +1289,19 @@ class TelethonTradingBot:
 
             elif param == "take_profits":
                 # Парсим список тейк-профитов [value1,value2,value3]
-                if value_str.startswith('[') and value_str.endswith(']'):
-                    values = value_str[1:-1].split(',')
-                    new_value = [float(v.strip()) for v in values]
-                    signal.take_profits = new_value
-                    await event.reply(f"✅ Тейк-профиты для {signal.symbol} изменены на {new_value}")
+                values = _parse_price_list(value_str)
+                if values is not None:
+                    # Указатель считаем от последней известной цены, чтобы пройденные тейки не отмечались повторно
+                    current_price, _ = await self.price_cache.get_price(signal.symbol)
+                    self._set_take_profits(signal, values, current_price)
+                    await event.reply(f"✅ Тейк-профиты для {signal.symbol} изменены на {signal.take_profits}")
                 else:
                     await event.reply("❌ Формат: [value1,value2,value3]")
 
             elif param == "entry_prices":
                 # Парсим список цен входа [value1,value2,value3]
-                if value_str.startswith('[') and value_str.endswith(']'):
-                    values = value_str[1:-1].split(',')
-                    new_value = [float(v.strip()) for v in values]
+                new_value = _parse_price_list(value_str)
+                if new_value is not None:
                     signal.entry_prices = new_value
                     await event.reply(f"✅ Цены входа для {signal.symbol} изменены на {new_value}")
                 else:
@@ -1090,9 +1344,10 @@ class TelethonTradingBot:
 `/adduser 123456789` - добавить пользователя с ID 123456789
 
 **Редактирование сделки:**
-`/editsignal BTCUSDT_1700000000 stop_loss 50000`
-`/editsignal BTCUSDT_1700000000 take_profits [51000,52000,53000]`
-`/editsignal BTCUSDT_1700000000 entry_prices [50000,49500]`
+`/editsignal 12 stop_loss 50000`
+`/editsignal 12 take_profits [51000,52000,53000]`
+`/editsignal 12 entry_prices [50000,49500]`
+Списки - числа через запятую в `[ ]`; inf и nan не принимаются
 
 **Добавление сделки вручную:**
 Отправьте `/addsignal` и следуйте инструкциям
@@ -1109,10 +1364,8 @@ class TelethonTradingBot:
     async def handle_add_signal_command(self, event):
         """Обработчик команды /addsignal - ручное добавление сделки"""
         # Устанавливаем состояние ожидания данных
-        if event.sender_id not in self.user_states:
-            self.user_states[event.sender_id] = UserState()
-
-        self.user_states[event.sender_id].waiting_for_signal = True
+        state = self._touch_user_state(event.sender_id, create=True)
+        state.waiting_for_signal = True
 
         instruction_text = """
 📝 **ДОБАВЛЕНИЕ СДЕЛКИ ВРУЧНУЮ**
@@ -1169,7 +1422,7 @@ class TelethonTradingBot:
 
             entry_price = float(parts[2])
             stop_loss = float(parts[3])
-            take_profits = [float(tp.strip()) for tp in parts[4].split(',')]
+            take_profits = list(map(float, parts[4].split(',')))  # float() сам пропускает пробелы
 
             # Проверяем цены
             if entry_price <= 0 or stop_loss <= 0:
@@ -1213,7 +1466,7 @@ class TelethonTradingBot:
             #         return
 
             # Создаем сигнал
-            signal = advanced_parser.TradeSignal()
+            signal = TradeSignal()
             signal.symbol = symbol
             signal.direction = direction
             signal.entry_prices = [entry_price]
@@ -1223,45 +1476,20 @@ class TelethonTradingBot:
             signal.margin = margin
             signal.source = source
             signal.timestamp = time.time()
+            signal.monotonic_start = time.monotonic()
 
             # Сохраняем в активные сделки
-            signal_id = f"{signal.symbol}_{int(signal.timestamp)}"
-            self.active_signals[signal_id] = signal
+            signal_id = self._add_active_signal(signal)
 
             # Логируем
-            logger.info(f"✅ РУЧНАЯ СДЕЛКА ДОБАВЛЕНА:")
-            logger.info(f"   ID: {signal_id}")
-            logger.info(f"   Символ: {signal.symbol}")
-            logger.info(f"   Направление: {signal.direction}")
-            logger.info(f"   Вход: {signal.entry_prices}")
-            logger.info(f"   Стоп: {signal.stop_loss}")
-            logger.info(f"   Тейки: {signal.take_profits}")
-            logger.info(f"   Плечо: {signal.leverage}")
-            logger.info(f"   Маржа: {signal.margin}")
-            logger.info(f"   Источник: {signal.source}")
+            logger.info(_MANUAL_SIGNAL_LOG,
+                        signal_id, signal.symbol, signal.direction, signal.entry_prices, signal.stop_loss,
+                        signal.take_profits, signal.leverage, signal.margin, signal.source)
 
             # Сохраняем в trading_data
-            signal_data = {
-                'signal_id': signal_id,
-                'symbol': signal.symbol,
-                'direction': signal.direction,
-                'entry_prices': signal.entry_prices,
-                'take_profits': signal.take_profits,
-                'stop_loss': signal.stop_loss,
-                'leverage': signal.leverage,
-                'margin': signal.margin,
-                'source': signal.source,
-                'pnl_percent': 0,
-                'reached_tps': [],
-                'exchange': 'Unknown',
-                'timestamp': signal.timestamp,
-                'is_market': False
-            }
+            signal_data = SignalData.from_signal(signal_id, signal)
             trading_data.update_signal_data(signal_data)
 
-            # Запускаем мониторинг
-            asyncio.create_task(self.monitor_signal(signal_id))
-
             # Отправляем подтверждение
             success_text = f"""
 ✅ **СДЕЛКА ДОБАВЛЕНА**
@@ -1286,9 +1514,8 @@ class TelethonTradingBot:
         except Exception as e:
             await event.reply(f"❌ Ошибка при добавлении сделки: {e}")
         finally:
-            # Сбрасываем состояние пользователя
-            if event.sender_id in self.user_states:
-                self.user_states[event.sender_id].waiting_for_signal = False
+            # Ввод сделки завершен - состояние пользователя больше не нужно
+            self.user_states.pop(event.sender_id, None)
 
     @admin_only
     async def handle_active_signals_command(self, event):
@@ -1299,20 +1526,7 @@ class TelethonTradingBot:
 
         active_text = "🔍 **АКТИВНЫЕ СДЕЛКИ (с ID)**\n\n"
 
-        for signal_id, signal in list(self.active_signals.items())[:10]:  # Ограничиваем чтобы не было слишком длинно
-            symbol_data = trading_data.get_symbol_data(signal.symbol)
-            current_price = symbol_data.get('current_price', 'N/A') if symbol_data else 'N/A'
-            pnl = symbol_data.get('pnl_percent', 0) if symbol_data else 0
-
-            direction_emoji = "🟢" if signal.direction == "LONG" else "🔴"
-            pnl_emoji = "📈" if pnl > 0 else "📉"
-
-            active_text += f"{direction_emoji} **{signal.symbol}** {signal.direction}\n"
-            active_text += f"   🆔 ID: `{signal_id}`\n"
-            active_text += f"   💰 Текущая цена: {current_price}\n"
-            active_text += f"   {pnl_emoji} PnL: {pnl:+.2f}%\n"
-            active_text += f"   🎯 Тейков: {len(signal.take_profits)}\n"
-            active_text += f"   📍 Источник: {signal.source}\n\n"
+        active_text += self._active_cards(_ACTIVE_ID_CARD, 10)  # Ограничиваем чтобы не было слишком длинно
 
         if len(self.active_signals) > 10:
             active_text += f"*... и еще {len(self.active_signals) - 10} сделок*"
@@ -1324,48 +1538,32 @@ class TelethonTradingBot:
 
     async def update_signal_in_web_interface(self, signal_id):
         """Обновляет данные сигнала в веб-интерфейсе"""
-        if signal_id not in self.active_signals:
+        signal = self.active_signals.get(signal_id)
+        if signal is None:
             return
 
-        signal = self.active_signals[signal_id]
-
         # Получаем текущую цену для расчета PnL
-        current_price, exchange_used = await multi_exchange.get_current_price(signal.symbol)
+        current_price, exchange_used = await self.price_cache.get_price(signal.symbol)
 
         pnl_percent = None
         reached_tps = []
 
         if current_price is not None and signal.entry_prices:
             entry_price = signal.entry_prices[0]
-            if signal.direction == "LONG":
-                pnl_percent = ((current_price - entry_price) / entry_price) * 100
-            else:
-                pnl_percent = ((entry_price - current_price) / entry_price) * 100
-
-            for i, tp in enumerate(signal.take_profits or []):
-                if (signal.direction == "LONG" and current_price >= tp) or \
-                        (signal.direction == "SHORT" and current_price <= tp):
-                    reached_tps.append(i)
-
-        signal_data = {
-            'signal_id': signal_id,
-            'symbol': signal.symbol,
-            'direction': signal.direction,
-            'entry_prices': signal.entry_prices or [],
-            'limit_prices': getattr(signal, "limit_prices", []) or [],
-            'take_profits': signal.take_profits or [],
-            'stop_loss': signal.stop_loss,
-            'leverage': signal.leverage,
-            'margin': signal.margin,
-            'source': signal.source,
-            'pnl_percent': pnl_percent,
-            'reached_tps': reached_tps,
-            'exchange': exchange_used,
-            'current_price': current_price,
-            'entry_executed': getattr(signal, "entry_executed", False),
-            'timestamp': signal.timestamp
-        }
+            sign = 1.0 if signal.direction == "LONG" else -1.0  # SHORT зарабатывает на падении цены
+            pnl_percent = sign * (current_price - entry_price) / entry_price * 100
+            reached_tps = [i for i, tp in enumerate(signal.take_profits or ()) if sign * (current_price - tp) >= 0]
+
+        signal_data = SignalData.from_signal(
+            signal_id, signal,
+            pnl_percent=pnl_percent,
+            reached_tps=reached_tps,
+            exchange=exchange_used,
+            current_price=current_price
+        )
         trading_data.update_signal_data(signal_data)
+        # Параметры сделки могли измениться - следующий тик мониторинга соберет снимок заново
+        self._web_signals.pop(signal_id, None)
 
     @private_only
     async def handle_dashboard_command(self, event):
@@ -1394,23 +1592,20 @@ class TelethonTradingBot:
 
         # Собираем статистику по активным сделкам
         stats_text = "📊 **Статистика сделок**\n\n"
-        total_pnl = 0
-        signals_with_pnl = 0
+        pnls = []
+        cards = []
+        symbols_data = {}
 
-        for signal_id, signal in list(self.active_signals.items())[:10]:
-            symbol_data = trading_data.get_symbol_data(signal.symbol)
+        for signal_id, signal in itertools.islice(self.active_signals.items(), 10):
+            symbol_data = _cached_symbol_data(symbols_data, signal.symbol)
             if symbol_data and 'pnl_percent' in symbol_data:
                 pnl = symbol_data['pnl_percent']
-                total_pnl += pnl
-                signals_with_pnl += 1
-
-                direction_emoji = "🟢" if signal.direction == "LONG" else "🔴"
-                pnl_emoji = "📈" if pnl > 0 else "📉"
+                pnls.append(pnl)
+                cards.append(self._format_card(_STATS_CARD, signal_id, signal, pnl=pnl))
 
-                stats_text += f"{direction_emoji} **{signal.symbol}** {signal.direction}\n"
-                stats_text += f"   {pnl_emoji} PnL: {pnl:+.2f}%\n"
-                stats_text += f"   🎯 Тейков: {len(signal.take_profits)}\n"
-                stats_text += f"   📍 Источник: {signal.source}\n\n"
+        stats_text += ''.join(cards)
+        total_pnl = sum(pnls)
+        signals_with_pnl = len(pnls)
 
         if signals_with_pnl > 0:
             avg_pnl = total_pnl / signals_with_pnl
@@ -1433,18 +1628,7 @@ class TelethonTradingBot:
 
         active_text = "🔄 **Активные сделки**\n\n"
 
-        for signal_id, signal in list(self.active_signals.items())[:5]:
-            symbol_data = trading_data.get_symbol_data(signal.symbol)
-            current_price = symbol_data.get('current_price', 'N/A') if symbol_data else 'N/A'
-            pnl = symbol_data.get('pnl_percent', 0) if symbol_data else 0
-
-            direction_emoji = "🟢" if signal.direction == "LONG" else "🔴"
-            pnl_emoji = "📈" if pnl > 0 else "📉"
-
-            active_text += f"{direction_emoji} **{signal.symbol}** {signal.direction}\n"
-            active_text += f"   💰 Цена: {current_price}\n"
-            active_text += f"   {pnl_emoji} PnL: {pnl:+.2f}%\n"
-            active_text += f"   🎯 Тейков: {len(signal.take_profits)}\n\n"
+        active_text += self._active_cards(_ACTIVE_CARD, 5)
 
         if len(self.active_signals) > 5:
             active_text += f"*... и еще {len(self.active_signals) - 5} сделок*"
@@ -1459,20 +1643,19 @@ class TelethonTradingBot:
             return
 
         # Проверяем, находится ли пользователь в процессе добавления сделки
-        if event.sender_id in self.user_states and self.user_states[event.sender_id].waiting_for_signal:
+        state = self.user_states.get(event.sender_id)
+        if state is not None and state.waiting_for_signal:
+            self._touch_user_state(event.sender_id)
             await self.process_add_signal_steps(event)
             return
 
-        text = event.raw_text
-        if text == "📊 Dashboard":
-            await self.handle_dashboard_command(event)
-        elif text == "📈 Статистика":
-            await self.handle_stats_command(event)
-        elif text == "🔄 Активные сделки":
-            await self.handle_active_command(event)
-        elif text == "❓ Помощь":
-            await self.handle_help_command(event)
-        elif text == "👑 Админ панель" and is_admin(event.sender_id):
+        handler = self._button_handlers.get(event.raw_text)
+        if handler:
+            await handler(event)
+
+    async def _handle_admin_button(self, event):
+        """Кнопка "Админ панель": для остальных пользователей молча игнорируется"""
+        if is_admin(event.sender_id):
             await self.handle_admin_command(event)
 
     @private_only
@@ -1481,204 +1664,177 @@ class TelethonTradingBot:
         if not await self.check_access(event):
             return
 
-        help_text = """
-❓ **Помощь по Trading Bot**
+        await event.reply(_ADMIN_HELP_TEXT if is_admin(event.sender_id) else _HELP_TEXT)
 
-**Основные команды:**
-/start - Главное меню
-/dashboard - Открыть веб-интерфейс  
-/stats - Статистика сделок
-/active - Активные сделки
-        """
-
-        # Добавляем админские команды если пользователь админ
-        if is_admin(event.sender_id):
-            help_text += "\n\n**👑 Админ команды:**\n"
-            help_text += "/admin - Админ панель\n"
-            help_text += "/adminhelp - Подробная справка по админ-командам\n"
-            help_text += "/adduser <id> - Добавить пользователя\n"
-            help_text += "/removeuser <id> - Удалить пользователя\n"
-            help_text += "/listusers - Список пользователей\n"
-            help_text += "/editsignal - Редактировать сделку\n"
-            help_text += "/addsignal - Добавить сделку вручную\n"
-            help_text += "/activesignals - Список сделок с ID\n"
-
-        await event.reply(help_text)
-
-    async def monitor_signal(self, signal_id: str):
-        """Мониторит цену для сигнала в реальном времени"""
-        if signal_id not in self.active_signals:
-            return
-
-        signal = self.active_signals[signal_id]
-        reached_tps: Set[int] = set()
-        error_count = 0
-        entry_executed = True  # Для рыночных входов сразу выполнено
-        max_errors = 5  # Максимальное количество ошибок подряд
-
-        logger.info(f"🔍 Начинаем мониторинг {signal.symbol} {signal.direction}")
+    async def _monitor_signals(self):
+        """Единый цикл мониторинга всех активных сигналов (вместо отдельной задачи на каждый сигнал)"""
+        while True:
+            try:
+                # Проверяем, нет ли критических ошибок
+                if self.event_loop_closed:
+                    logger.critical("❌ Мониторинг приостановлен: цикл событий закрыт")
+                    await asyncio.sleep(10)
+                    continue
+
+                # Локальные ссылки на то, что дергается на каждом символе (price_cache может быть пересоздан)
+                signals_by_symbol = self._signals_by_symbol
+                evaluate = self._evaluate_signal
+                price_for_tick = self._price_for_tick
+
+                symbols = list(signals_by_symbol)
+                if symbols:
+                    # Цены из WebSocket отдаются сразу, остальные запрашиваются параллельно (с лимитом в PriceCache).
+                    # Символ оцениваем, как только пришла его цена: медленный REST-запрос не держит остальные
+                    tasks = [asyncio.create_task(price_for_tick(symbol)) for symbol in symbols]
+                    try:
+                        for next_price in asyncio.as_completed(tasks):
+                            symbol, result = await next_price
+                            if result is None:
+                                continue  # Не дождались - оценим на следующем тике
+                            current_price, exchange_used = result
+
+                            # Проверяем, не является ли ошибка критической
+                            if exchange_used == "Event loop closed":
+                                logger.critical("❌ КРИТИЧЕСКАЯ ОШИБКА при мониторинге %s: цикл событий закрыт", symbol)
+                                self.event_loop_closed = True
+
+                                # Сохраняем сигналы в историю с причиной ошибки
+                                for signal_id in list(self._signals_by_symbol.get(symbol, ())):
+                                    await self.save_to_history(signal_id, "event_loop_error", 0)
+
+                                # Пытаемся восстановиться
+                                await self._handle_event_loop_error()
+                                break
+
+                            for signal_id in list(signals_by_symbol.get(symbol, ())):
+                                await evaluate(signal_id, current_price, exchange_used)
+                    finally:
+                        # После break (цикл событий закрыт) недождавшиеся запросы не нужны
+                        for task in tasks:
+                            task.cancel()
+
+                    self._flush_web_updates()
+
+                # Просыпаемся на каждый пакет цен из потока, иначе - по интервалу опроса
+                await price_tracker.wait_for_tick(timeout=self.monitor_interval)
+
+            except asyncio.CancelledError:
+                logger.info("🔄 Мониторинг сигналов остановлен")
+                raise
+            except RuntimeError as e:
+                if is_loop_closed_error(e):
+                    logger.critical("❌ КРИТИЧЕСКАЯ ОШИБКА RUNTIME мониторинга: %s", e)
+                    self.event_loop_closed = True
+                    await self._handle_event_loop_error()
+                else:
+                    logger.error("⚠️  RuntimeError в цикле мониторинга: %s", e)
+                    await asyncio.sleep(5)
+            except Exception as e:
+                logger.exception("⚠️  Ошибка в цикле мониторинга: %s", e)
+                await asyncio.sleep(5)
 
+    async def _price_for_tick(self, symbol: str) -> tuple[str, Optional[tuple[Optional[float], Optional[str]]]]:
+        """Цена символа для тика мониторинга; None вместо цены - если не дождались за price_timeout"""
         try:
-            while signal_id in self.active_signals and error_count < max_errors:
-                try:
-                    # Проверяем, нет ли критических ошибок
-                    if self.event_loop_closed:
-                        logger.critical(f"❌ Мониторинг {signal.symbol} приостановлен: цикл событий закрыт")
-                        await asyncio.sleep(10)
-                        continue
-
-                    current_price, exchange_used = await self.price_cache.get_price(signal.symbol)
-
-                    # Проверяем, не является ли ошибка критической
-                    if exchange_used == "Event loop closed":
-                        logger.critical(f"❌ КРИТИЧЕСКАЯ ОШИБКА при мониторинге {signal.symbol}: цикл событий закрыт")
-                        self.event_loop_closed = True
+            # PriceCache защищает запрос через shield: по таймауту он не отменяется и попадет в кэш к следующему тику
+            return symbol, await asyncio.wait_for(self.price_cache.get_price(symbol), self.price_timeout)
+        except asyncio.TimeoutError:
+            logger.debug("⏳ Цена %s не получена за %s сек", symbol, self.price_timeout)
+            return symbol, None
+        except Exception as e:
+            logger.error("⚠️  Ошибка получения цены %s: %s", symbol, e)
+            return symbol, (None, "None")
 
-                        # Сохраняем сигнал в историю с причиной ошибки
-                        await self.save_to_history(signal_id, "event_loop_error", 0)
+    def _flush_web_updates(self):
+        """Передает накопленные за тик обновления в веб-интерфейс одним вызовом"""
+        if not self._signal_updates and not self._price_updates:
+            return
 
-                        # Удаляем из активных
-                        if signal_id in self.active_signals:
-                            del self.active_signals[signal_id]
+        signal_updates, self._signal_updates = self._signal_updates, []
+        price_updates, self._price_updates = self._price_updates, {}
+        trading_data.bulk_update(signal_updates, price_updates)
 
-                        # Пытаемся восстановиться
-                        await self._handle_event_loop_error()
-                        break
+    async def _evaluate_signal(self, signal_id: int, current_price: Optional[float], exchange_used: str):
+        """Проверяет тейки и стоп сигнала по новой цене и обновляет данные веб-интерфейса"""
+        signal = self.active_signals.get(signal_id)
+        if signal is None:
+            return
 
-                    # Если не удалось получить цену
-                    if current_price is None:
-                        error_count += 1
-                        if error_count >= max_errors:
-                            logger.error(f"❌ Прекращаем мониторинг {signal.symbol} - символ не найден на биржах")
-
-                            # Сохраняем в историю с причиной ошибки
-                            await self.save_to_history(signal_id, "symbol_not_found", 0)
-
-                            # Удаляем из активных
-                            if signal_id in self.active_signals:
-                                del self.active_signals[signal_id]
-                            break
-
-                        await asyncio.sleep(10)
-                        continue
-
-                    # Сброс счетчика ошибок
-                    error_count = 0
-
-                    # Рассчитываем PnL
-                    pnl_percent = 0
-                    if signal.entry_prices:
-                        entry_price = signal.entry_prices[0]
-                        if signal.direction == "LONG":
-                            pnl_percent = ((current_price - entry_price) / entry_price) * 100
-                            # Проверяем тейк-профиты
-                            for i, tp in enumerate(signal.take_profits):
-                                if current_price >= tp and i not in reached_tps:
-                                    logger.info(f"🎯 ДОСТИГНУТ ТЕЙК-ПРОФИТ #{i + 1} для {signal.symbol}: {tp}")
-                                    reached_tps.add(i)
-                        else:  # SHORT
-                            pnl_percent = ((entry_price - current_price) / entry_price) * 100
-                            for i, tp in enumerate(signal.take_profits):
-                                if current_price <= tp and i not in reached_tps:
-                                    logger.info(f"🎯 ДОСТИГНУТ ТЕЙК-ПРОФИТ #{i + 1} для {signal.symbol}: {tp}")
-                                    reached_tps.add(i)
-
-                    # 🔥 ОБНОВЛЯЕМ ДАННЫЕ В TRADING_DATA
-                    signal_data = {
-                        'signal_id': signal_id,
-                        'symbol': signal.symbol,
-                        'direction': signal.direction,
-                        'entry_prices': signal.entry_prices,
-                        'limit_prices': signal.limit_prices,
-                        'take_profits': signal.take_profits,
-                        'stop_loss': signal.stop_loss,
-                        'leverage': signal.leverage,
-                        'margin': signal.margin,
-                        'source': signal.source,
-                        'pnl_percent': pnl_percent,
-                        'reached_tps': list(reached_tps),
-                        'exchange': exchange_used,
-                        'timestamp': signal.timestamp,
-                        'entry_executed': entry_executed
-                    }
-                    trading_data.update_signal_data(signal_data)
+        # Если не удалось получить цену - ждем, но не дольше max_price_failure_time
+        if current_price is None:
+            first_failure = self._price_failures.setdefault(signal_id, time.monotonic())
+            if time.monotonic() - first_failure >= self.max_price_failure_time:
+                logger.error("❌ Прекращаем мониторинг %s - символ не найден на биржах", signal.symbol)
+                await self.save_to_history(signal_id, "symbol_not_found", 0)
+            return
 
-                    # Обновляем ценовые данные
-                    price_data = {
-                        'current_price': current_price,
-                        'entry_price': signal.entry_prices[0] if signal.entry_prices else current_price,
-                        'pnl_percent': pnl_percent,
-                        'timestamp': signal.timestamp,
-                        'exchange': exchange_used,
-                        'entry_executed': entry_executed
-                    }
-                    trading_data.update_price_data(signal.symbol, price_data)
-
-                    # Логируем в консоль (раз в 30 секунд чтобы не засорять логи)
-                    if int(time.time()) % 30 == 0:
-                        status = "🟢" if pnl_percent > 0 else "🔴"
-                        logger.info(f"{status} {signal.symbol}: {pnl_percent:+.2f}% | Цена: {current_price}")
-
-                    # Проверяем завершение сделки
-                    if len(reached_tps) == len(signal.take_profits) and signal.take_profits:
-                        logger.info(f"✅ ВСЕ ТЕЙК-ПРОФИТЫ ДОСТИГНУТЫ для {signal.symbol}")
-                        await self.save_to_history(signal_id, "all_take_profits", current_price)
-                        if signal_id in self.active_signals:
-                            del self.active_signals[signal_id]
-                        break
+        # Сброс счетчика ошибок
+        self._price_failures.pop(signal_id, None)
 
-                    if signal.stop_loss:
-                        if (signal.direction == "LONG" and current_price <= signal.stop_loss) or \
-                                (signal.direction == "SHORT" and current_price >= signal.stop_loss):
-                            logger.info(f"🛑 ДОСТИГНУТ СТОП-ЛОСС для {signal.symbol}: {signal.stop_loss}")
-                            await self.save_to_history(signal_id, "stop_loss", current_price)
-                            if signal_id in self.active_signals:
-                                del self.active_signals[signal_id]
-                            break
+        entry_executed = True  # Для рыночных входов сразу выполнено
+        symbol = signal.symbol
+        entry_prices = signal.entry_prices
+        take_profits = signal.take_profits
+        stop_loss = signal.stop_loss
+        sign = 1.0 if signal.direction == "LONG" else -1.0  # SHORT зарабатывает на падении цены
+        next_tp = signal.next_tp
+
+        # Рассчитываем PnL
+        pnl_percent = 0
+        if entry_prices:
+            entry_price = entry_prices[0]
+            pnl_percent = sign * (current_price - entry_price) / entry_price * 100
+
+            # Проверяем тейк-профиты, начиная со следующего недостигнутого
+            tp_count = len(take_profits)
+            while next_tp < tp_count:
+                tp = take_profits[next_tp]
+                if sign * (current_price - tp) < 0:
+                    break
+                next_tp += 1
+                logger.info("🎯 ДОСТИГНУТ ТЕЙК-ПРОФИТ #%s для %s: %s", next_tp, symbol, tp)
+            signal.next_tp = next_tp
+
+        # 🔥 ОБНОВЛЯЕМ ДАННЫЕ В TRADING_DATA (снимок сигнала создается один раз, дальше меняется только состояние)
+        signal_data = self._web_signals.get(signal_id)
+        if signal_data is None:
+            signal_data = self._web_signals[signal_id] = SignalData.from_signal(signal_id, signal)
+        self._signal_updates.append(
+            (signal_data, (pnl_percent, next_tp, exchange_used, current_price, entry_executed)))
+
+        # Обновляем ценовые данные (запись по символу одна на тик - ее дает первая сделка по символу)
+        if symbol not in self._price_updates:
+            self._price_updates[symbol] = {
+                'current_price': current_price,
+                'entry_price': entry_prices[0] if entry_prices else current_price,
+                'pnl_percent': pnl_percent,
+                'timestamp': signal.timestamp,
+                'exchange': exchange_used,
+                'entry_executed': entry_executed
+            }
 
-                    await asyncio.sleep(5)
+        # Логируем в консоль (раз в 30 секунд чтобы не засорять логи)
+        if int(time.time()) % 30 == 0:
+            status = "🟢" if pnl_percent > 0 else "🔴"
+            logger.info("%s %s: %+.2f%% | Цена: %s", status, symbol, pnl_percent, current_price)
 
-                except RuntimeError as e:
-                    if "Event loop is closed" in str(e) or "no running event loop" in str(e):
-                        logger.critical(f"❌ КРИТИЧЕСКАЯ ОШИБКА RUNTIME в мониторинге {signal.symbol}: {e}")
-                        self.event_loop_closed = True
-                        await self._handle_event_loop_error()
-                        break
-                    else:
-                        logger.error(f"⚠️  RuntimeError в цикле мониторинга {signal.symbol}: {e}")
-                        error_count += 1
-                        await asyncio.sleep(5)
-                except asyncio.CancelledError:
-                    logger.info(f"🔄 Мониторинг {signal_id} отменен")
-                    break
-                except Exception as e:
-                    logger.error(f"⚠️  Ошибка в цикле мониторинга {signal.symbol}: {e}")
-                    error_count += 1
-                    await asyncio.sleep(5)
+        # Проверяем завершение сделки
+        if take_profits and next_tp == len(take_profits):
+            logger.info("✅ ВСЕ ТЕЙК-ПРОФИТЫ ДОСТИГНУТЫ для %s", symbol)
+            await self.save_to_history(signal_id, "all_take_profits", current_price)
+            return
 
-        except RuntimeError as e:
-            if "Event loop is closed" in str(e) or "no running event loop" in str(e):
-                logger.critical(f"❌ КРИТИЧЕСКАЯ ОШИБКА RUNTIME мониторинга {signal.symbol}: {e}")
-                self.event_loop_closed = True
-                await self._handle_event_loop_error()
-            else:
-                logger.error(f"❌ RuntimeError мониторинга {signal.symbol}: {e}")
-        except Exception as e:
-            logger.error(f"❌ Критическая ошибка мониторинга {signal.symbol}: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-        finally:
-            # Очищаем ресурсы если сигнал еще активен
-            if signal_id in self.active_signals:
-                logger.warning(f"⚠️  Мониторинг {signal_id} завершился неожиданно")
+        if stop_loss:
+            if sign * (current_price - stop_loss) <= 0:
+                logger.info("🛑 ДОСТИГНУТ СТОП-ЛОСС для %s: %s", symbol, stop_loss)
+                await self.save_to_history(signal_id, "stop_loss", current_price)
 
-    async def save_to_history(self, signal_id: str, close_reason: str, close_price: float):
+    async def save_to_history(self, signal_id: int, close_reason: str, close_price: float):
         """Сохраняет сделку в историю и удаляет из активных"""
-        if signal_id not in self.active_signals:
+        signal = self.active_signals.get(signal_id)
+        if signal is None:
             return
 
-        signal = self.active_signals[signal_id]
-
         history_entry = {
             'signal_id': signal_id,
             'symbol': signal.symbol,
@@ -1693,32 +1849,44 @@ class TelethonTradingBot:
             'close_reason': close_reason,
             'close_price': close_price,
             'close_time': time.time(),
-            'duration_minutes': (time.time() - signal.timestamp) / 60
+            'duration_minutes': (time.monotonic() - signal.monotonic_start) / 60
         }
 
         # Сохраняем в глобальные данные
         trading_data.add_to_history(history_entry)
 
-        logger.info(f"📝 Сделка {signal.symbol} добавлена в историю с причиной: {close_reason}")
+        logger.info("📝 Сделка %s добавлена в историю с причиной: %s", signal.symbol, close_reason)
 
         # Удаляем из активных
-        if signal_id in self.active_signals:
-            del self.active_signals[signal_id]
+        self._remove_active_signal(signal_id)
 
 
 async def run_telethon_bot():
     """Запускает Telethon бота"""
+    bot = None
     try:
         bot = TelethonTradingBot()
         await bot.start()
     except KeyboardInterrupt:
         logger.info("🛑 Бот остановлен пользователем")
     except Exception as e:
-        logger.error(f"❌ Критическая ошибка запуска бота: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
+        logger.exception("❌ Критическая ошибка запуска бота: %s", e)
+    finally:
+        # Сессии закрываем на том же цикле событий, где они созданы
+        await price_tracker.close()
+        await multi_exchange.close()
+        if bot is not None:
+            bot._parser_pool.shutdown(wait=False, cancel_futures=True)
 
 
 if __name__ == "__main__":
+    # При запуске без main.py тоже используем uvloop, если он установлен
+    try:
+        import uvloop
+
+        uvloop.install()
+    except ImportError:
+        pass
+
     # Запуск бота
     asyncio.run(run_telethon_bot())
@@ -2,6 +2,8 @@ import aiohttp
 import asyncio
 import logging
 from typing import Optional, Dict, Any
+from .utils import (RateLimitError, raise_for_rate_limit, retry_with_backoff, json_loads, get_shared_session,
+                    is_loop_closed_error)
 
 logger = logging.getLogger(__name__)
 
@@ -11,58 +13,69 @@ class BinancePublicAPI:
         self.base_url = "https://api.binance.com/api/v3"
         self.session = None
         self.valid_symbols_cache = set()  # Кеш для валидных символов
+        # Полный список торгуемых пар из exchangeInfo (пустой - еще не загружен)
+        self.symbols: frozenset = frozenset()
+        self._symbols_by_base: Dict[str, list] = {}
 
     async def get_session(self) -> aiohttp.ClientSession:
         """Создает или возвращает существующую сессию"""
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            self.session = get_shared_session()
         return self.session
 
-    async def is_symbol_valid(self, symbol: str) -> bool:
-        """Проверяет, существует ли символ на Binance с улучшенной диагностикой"""
+    async def load_symbols(self) -> bool:
+        """Загружает все торгуемые пары одним запросом exchangeInfo"""
         try:
-            normalized_symbol = self.normalize_symbol(symbol)
-
-            # Если уже проверяли этот символ, используем кеш
-            if normalized_symbol in self.valid_symbols_cache:
-                return True
-
             session = await self.get_session()
-            url = f"{self.base_url}/ticker/price?symbol={normalized_symbol}"
+            url = f"{self.base_url}/exchangeInfo"
 
             async with session.get(url) as response:
-                if response.status == 200:
-                    self.valid_symbols_cache.add(normalized_symbol)
-                    logger.info(f"✅ Символ {normalized_symbol} валиден")
-                    return True
-                else:
-                    # Пробуем найти альтернативные котируемые активы
-                    alternative_symbols = await self.find_alternative_symbols(symbol)
-                    if alternative_symbols:
-                        logger.info(f"🔍 Найдены альтернативы для {symbol}: {alternative_symbols}")
-                        # Используем первую найденную альтернативу
-                        best_alternative = alternative_symbols[0]
-                        self.valid_symbols_cache.add(best_alternative)
-                        logger.info(f"🎯 Используем альтернативу: {best_alternative}")
-                        return True
-                    else:
-                        logger.warning(f"🚫 Символ {normalized_symbol} невалиден: HTTP {response.status}")
-                        return False
+                raise_for_rate_limit(response)
+                if response.status != 200:
+                    logger.error("❌ Binance: Ошибка загрузки exchangeInfo: HTTP %s", response.status)
+                    return False
+                data = await response.json(loads=json_loads)
+
+            symbols_by_base: Dict[str, list] = {}
+            for symbol_info in data['symbols']:
+                if symbol_info['status'] == 'TRADING':
+                    symbols_by_base.setdefault(symbol_info['baseAsset'], []).append(symbol_info['symbol'])
+
+            self._symbols_by_base = symbols_by_base
+            self.symbols = frozenset(s for pairs in symbols_by_base.values() for s in pairs)
+            logger.info("✅ Binance: Загружено %d торговых пар", len(self.symbols))
+            return True
 
         except Exception as e:
-            logger.error(f"❌ Ошибка проверки символа {symbol}: {e}")
+            logger.error("❌ Binance: Ошибка загрузки списка символов: %s", e)
             return False
 
+    @staticmethod
+    def _sort_by_quote_priority(alternatives: list) -> list:
+        """Сортирует пары по приоритету котируемых активов"""
+        quote_priority = ['USDT', 'BUSD', 'BTC', 'ETH', 'BNB', 'USD', 'EUR']
+        alternatives.sort(key=lambda x: (
+            [quote in x for quote in quote_priority].index(True)
+            if any(quote in x for quote in quote_priority)
+            else len(quote_priority)
+        ))
+        return alternatives
+
     async def find_alternative_symbols(self, base_symbol: str) -> list:
         """Ищет альтернативные торговые пары для базового символа"""
         try:
             base_symbol = base_symbol.upper()
+
+            # Список пар уже загружен - обходимся без запроса
+            if self._symbols_by_base:
+                return self._sort_by_quote_priority(list(self._symbols_by_base.get(base_symbol, [])))
+
             session = await self.get_session()
             url = "https://api.binance.com/api/v3/exchangeInfo"
 
             async with session.get(url) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await response.json(loads=json_loads)
                     symbols = data['symbols']
 
                     # Ищем все пары где базовый актив совпадает
@@ -72,19 +85,12 @@ class BinancePublicAPI:
                             alternatives.append(symbol_info['symbol'])
 
                     # Сортируем по приоритету котируемых активов
-                    quote_priority = ['USDT', 'BUSD', 'BTC', 'ETH', 'BNB', 'USD', 'EUR']
-                    alternatives.sort(key=lambda x: (
-                        [quote in x for quote in quote_priority].index(True)
-                        if any(quote in x for quote in quote_priority)
-                        else len(quote_priority)
-                    ))
-
-                    return alternatives
+                    return self._sort_by_quote_priority(alternatives)
                 else:
                     return []
 
         except Exception as e:
-            logger.error(f"❌ Ошибка поиска альтернатив для {base_symbol}: {e}")
+            logger.error("❌ Ошибка поиска альтернатив для %s: %s", base_symbol, e)
             return []
 
     async def is_symbol_valid(self, symbol: str) -> bool:
@@ -96,39 +102,57 @@ class BinancePublicAPI:
             if normalized_symbol in self.valid_symbols_cache:
                 return True
 
+            # Список пар загружен - проверка без сетевого запроса
+            if self.symbols:
+                if normalized_symbol in self.symbols:
+                    self.valid_symbols_cache.add(normalized_symbol)
+                    return True
+
+                alternative_symbols = await self.find_alternative_symbols(symbol)
+                if alternative_symbols:
+                    logger.info("🎯 Используем альтернативу для %s: %s", symbol, alternative_symbols[0])
+                    self.valid_symbols_cache.add(alternative_symbols[0])
+                    return True
+                return False
+
             session = await self.get_session()
             url = f"{self.base_url}/ticker/price?symbol={normalized_symbol}"
 
             async with session.get(url) as response:
+                raise_for_rate_limit(response)
                 if response.status == 200:
                     self.valid_symbols_cache.add(normalized_symbol)
-                    logger.info(f"✅ Символ {normalized_symbol} валиден")
+                    logger.info("✅ Символ %s валиден", normalized_symbol)
                     return True
                 else:
                     # Пробуем найти альтернативные котируемые активы
                     alternative_symbols = await self.find_alternative_symbols(symbol)
                     if alternative_symbols:
-                        logger.info(f"🔍 Найдены альтернативы для {symbol}: {alternative_symbols}")
+                        logger.info("🔍 Найдены альтернативы для %s: %s", symbol, alternative_symbols)
                         # Используем первую найденную альтернативу
                         best_alternative = alternative_symbols[0]
                         self.valid_symbols_cache.add(best_alternative)
-                        logger.info(f"🎯 Используем альтернативу: {best_alternative}")
+                        logger.info("🎯 Используем альтернативу: %s", best_alternative)
                         return True
                     else:
-                        logger.warning(f"🚫 Символ {normalized_symbol} невалиден: HTTP {response.status}")
+                        logger.warning("🚫 Символ %s невалиден: HTTP %s", normalized_symbol, response.status)
                         return False
 
+        except (RateLimitError, aiohttp.ClientError):
+            # Сами не повторяем: повтор делает один уровень - get_current_price, иначе задержки вкладываются
+            raise
         except RuntimeError as e:
-            if "Event loop is closed" in str(e) or "no running event loop" in str(e):
-                logger.critical(f"❌ Binance: КРИТИЧЕСКАЯ ОШИБКА Event loop при проверке символа {symbol}")
+            if is_loop_closed_error(e):
+                logger.critical("❌ Binance: КРИТИЧЕСКАЯ ОШИБКА Event loop при проверке символа %s", symbol)
                 raise  # Пробрасываем выше для обработки в multi_exchange
             else:
-                logger.error(f"❌ Binance: RuntimeError проверки символа {symbol}: {e}")
+                logger.error("❌ Binance: RuntimeError проверки символа %s: %s", symbol, e)
                 return False
         except Exception as e:
-            logger.error(f"❌ Ошибка проверки символа {symbol}: {e}")
+            logger.error("❌ Ошибка проверки символа %s: %s", symbol, e)
             return False
 
+    @retry_with_backoff()
     async def get_current_price(self, symbol: str) -> Optional[float]:
         """Получает текущую цену символа через публичный API с поддержкой альтернатив"""
         try:
@@ -153,27 +177,28 @@ class BinancePublicAPI:
             url = f"{self.base_url}/ticker/price?symbol={normalized_symbol}"
 
             async with session.get(url) as response:
+                raise_for_rate_limit(response)
                 if response.status == 200:
-                    data = await response.json()
+                    data = await response.json(loads=json_loads)
                     price = float(data['price'])
-                    logger.debug(f"💰 Цена {normalized_symbol}: {price}")
+                    logger.debug("💰 Цена %s: %s", normalized_symbol, price)
                     return price
                 else:
-                    logger.error(f"❌ Ошибка получения цены для {normalized_symbol}: HTTP {response.status}")
+                    logger.error("❌ Ошибка получения цены для %s: HTTP %s", normalized_symbol, response.status)
                     return None
 
         except RuntimeError as e:
-            if "Event loop is closed" in str(e) or "no running event loop" in str(e):
-                logger.critical(f"❌ Binance: КРИТИЧЕСКАЯ ОШИБКА Event loop при получении цены {symbol}")
+            if is_loop_closed_error(e):
+                logger.critical("❌ Binance: КРИТИЧЕСКАЯ ОШИБКА Event loop при получении цены %s", symbol)
                 raise
             else:
-                logger.error(f"❌ Binance: RuntimeError получения цены {symbol}: {e}")
+                logger.error("❌ Binance: RuntimeError получения цены %s: %s", symbol, e)
                 return None
-        except aiohttp.ClientError as e:
-            logger.error(f"❌ Сетевая ошибка для {symbol}: {e}")
-            return None
+        except (RateLimitError, aiohttp.ClientError) as e:
+            logger.error("❌ Сетевая ошибка для %s: %s", symbol, e)
+            raise  # Повтор с задержкой - в retry_with_backoff
         except Exception as e:
-            logger.error(f"❌ Неизвестная ошибка для {symbol}: {e}")
+            logger.error("❌ Неизвестная ошибка для %s: %s", symbol, e)
             return None
 
     async def get_symbol_info(self, symbol: str) -> Dict[str, Any]:
@@ -185,14 +210,14 @@ class BinancePublicAPI:
 
             async with session.get(url) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await response.json(loads=json_loads)
                     return data
                 else:
-                    logger.error(f"❌ Ошибка получения информации о {symbol}: HTTP {response.status}")
+                    logger.error("❌ Ошибка получения информации о %s: HTTP %s", symbol, response.status)
                     return {}
 
         except Exception as e:
-            logger.error(f"❌ Ошибка получения информации о {symbol}: {e}")
+            logger.error("❌ Ошибка получения информации о %s: %s", symbol, e)
             return {}
 
     def normalize_symbol(self, symbol: str) -> str:
@@ -211,9 +236,8 @@ class BinancePublicAPI:
         return symbol + 'USDT'
 
     async def close(self):
-        """Закрывает сессию"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Отпускает сессию: она общая для всех клиентов, закрывает ее utils.close_shared_session"""
+        self.session = None
 
 
 # Глобальный экземпляр
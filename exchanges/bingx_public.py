@@ -2,6 +2,7 @@ import aiohttp
 import asyncio
 import logging
 from typing import Optional, Dict, Any
+from .utils import RateLimitError, raise_for_rate_limit, retry_with_backoff, json_loads, get_shared_session
 
 logger = logging.getLogger(__name__)
 
@@ -11,11 +12,13 @@ class BingXPublicAPI:
         self.base_url = "https://open-api.bingx.com/openApi"
         self.session = None
         self.valid_symbols_cache = set()
+        # Полный список контрактов (пустой - еще не загружен)
+        self.symbols: frozenset = frozenset()
 
     async def get_session(self) -> aiohttp.ClientSession:
         """Создает или возвращает существующую сессию"""
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            self.session = get_shared_session()
         return self.session
 
     async def is_symbol_valid(self, symbol: str) -> bool:
@@ -26,29 +29,38 @@ class BingXPublicAPI:
             if normalized_symbol in self.valid_symbols_cache:
                 return True
 
+            # Список контрактов загружен - проверка без сетевого запроса
+            if self.symbols:
+                return normalized_symbol in self.symbols
+
             session = await self.get_session()
             url = f"{self.base_url}/swap/v2/quote/price"
             params = {"symbol": normalized_symbol}
 
             async with session.get(url, params=params) as response:
+                raise_for_rate_limit(response)
                 if response.status == 200:
-                    data = await response.json()
+                    data = await response.json(loads=json_loads)
                     if data.get('code') == 0 and data.get('data'):
                         self.valid_symbols_cache.add(normalized_symbol)
-                        logger.info(f"✅ BingX: Символ {normalized_symbol} валиден")
+                        logger.info("✅ BingX: Символ %s валиден", normalized_symbol)
                         return True
                     else:
                         logger.warning(
-                            f"🚫 BingX: Символ {normalized_symbol} невалиден - {data.get('msg', 'Unknown error')}")
+                            "🚫 BingX: Символ %s невалиден - %s", normalized_symbol, data.get('msg', 'Unknown error'))
                         return False
                 else:
-                    logger.warning(f"🚫 BingX: Ошибка HTTP {response.status} для {normalized_symbol}")
+                    logger.warning("🚫 BingX: Ошибка HTTP %s для %s", response.status, normalized_symbol)
                     return False
 
+        except (RateLimitError, aiohttp.ClientError):
+            # Сами не повторяем: повтор делает один уровень - get_current_price, иначе задержки вкладываются
+            raise
         except Exception as e:
-            logger.error(f"❌ BingX: Ошибка проверки символа {symbol}: {e}")
+            logger.error("❌ BingX: Ошибка проверки символа %s: %s", symbol, e)
             return False
 
+    @retry_with_backoff()
     async def get_current_price(self, symbol: str) -> Optional[float]:
         """Получает текущую цену символа через BingX API"""
         try:
@@ -59,8 +71,9 @@ class BingXPublicAPI:
             params = {"symbol": normalized_symbol}
 
             async with session.get(url, params=params) as response:
+                raise_for_rate_limit(response)
                 if response.status == 200:
-                    data = await response.json()
+                    data = await response.json(loads=json_loads)
                     if data.get('code') == 0 and data.get('data'):
                         price_data = data['data']
                         if isinstance(price_data, list) and len(price_data) > 0:
@@ -68,18 +81,21 @@ class BingXPublicAPI:
                         else:
                             price = float(price_data.get('price', 0))
 
-                        logger.debug(f"💰 BingX: Цена {normalized_symbol}: {price}")
+                        logger.debug("💰 BingX: Цена %s: %s", normalized_symbol, price)
                         return price
                     else:
                         logger.error(
-                            f"❌ BingX: Ошибка получения цены для {normalized_symbol}: {data.get('msg', 'Unknown error')}")
+                            "❌ BingX: Ошибка получения цены для %s: %s",
+                            normalized_symbol, data.get('msg', 'Unknown error'))
                         return None
                 else:
-                    logger.error(f"❌ BingX: Ошибка HTTP {response.status} для {normalized_symbol}")
+                    logger.error("❌ BingX: Ошибка HTTP %s для %s", response.status, normalized_symbol)
                     return None
 
+        except (RateLimitError, aiohttp.ClientError):
+            raise  # Повтор с задержкой - в retry_with_backoff
         except Exception as e:
-            logger.error(f"❌ BingX: Неизвестная ошибка для {symbol}: {e}")
+            logger.error("❌ BingX: Неизвестная ошибка для %s: %s", symbol, e)
             return None
 
     def normalize_symbol(self, symbol: str) -> str:
@@ -105,19 +121,28 @@ class BingXPublicAPI:
 
             async with session.get(url) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await response.json(loads=json_loads)
                     if data.get('code') == 0:
                         symbols = [item['symbol'] for item in data.get('data', [])]
                         return symbols
                 return []
         except Exception as e:
-            logger.error(f"❌ BingX: Ошибка получения списка символов: {e}")
+            logger.error("❌ BingX: Ошибка получения списка символов: %s", e)
             return []
 
+    async def load_symbols(self) -> bool:
+        """Загружает список контрактов для проверки символов без запросов"""
+        symbols = await self.get_swap_symbols()
+        if not symbols:
+            return False
+
+        self.symbols = frozenset(symbols)
+        logger.info("✅ BingX: Загружено %d контрактов", len(self.symbols))
+        return True
+
     async def close(self):
-        """Закрывает сессию"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Отпускает сессию: она общая для всех клиентов, закрывает ее utils.close_shared_session"""
+        self.session = None
 
 
 # Глобальный экземпляр
@@ -1,8 +1,11 @@
 import asyncio
 import logging
+import time
+from collections import OrderedDict
 from typing import Optional, Tuple
 from .binance_public import binance_public
 from .bingx_public import bingx_public
+from .utils import close_shared_session, is_loop_closed_error
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +18,41 @@ class MultiExchangeAPI:
         ]
         self._event_loop_warning_logged = False
 
+        # Кэш "символ -> биржа" (None - символа нет ни на одной бирже)
+        self._symbol_exchange_cache: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+        self.symbol_cache_ttl = 3600  # секунд для найденных символов
+        # секунд для ненайденных: меньше окна max_price_failure_time монитора (50 с),
+        # чтобы устаревший отказ не снял сигнал без повторной проверки
+        self.symbol_cache_negative_ttl = 30
+        self.symbol_cache_size = 4096
+
+    def _get_cached_exchange(self, symbol: str) -> Tuple[bool, Optional[str]]:
+        """Возвращает (есть ли запись в кэше, имя биржи или None)"""
+        entry = self._symbol_exchange_cache.get(symbol)
+        if entry is None:
+            return False, None
+
+        exchange_name, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._symbol_exchange_cache[symbol]
+            return False, None
+
+        self._symbol_exchange_cache.move_to_end(symbol)
+        return True, exchange_name
+
+    def _cache_exchange(self, symbol: str, exchange_name: Optional[str]):
+        """Запоминает биржу символа, вытесняя самые старые записи"""
+        ttl = self.symbol_cache_ttl if exchange_name else self.symbol_cache_negative_ttl
+        self._symbol_exchange_cache[symbol] = (exchange_name, time.monotonic() + ttl)
+        self._symbol_exchange_cache.move_to_end(symbol)
+
+        while len(self._symbol_exchange_cache) > self.symbol_cache_size:
+            self._symbol_exchange_cache.popitem(last=False)
+
+    def _symbols_loaded(self) -> bool:
+        """True, если списки символов загружены на всех биржах и отказ не зависит от сети"""
+        return all(exchange_api.symbols for _, exchange_api in self.exchanges)
+
     def _check_event_loop(self) -> bool:
         """Проверяет состояние event loop. Возвращает True если есть проблемы."""
         try:
@@ -28,16 +66,16 @@ class MultiExchangeAPI:
         except RuntimeError as e:
             if "no running event loop" in str(e) or "no current event loop" in str(e):
                 if not self._event_loop_warning_logged:
-                    logger.critical(f"❌ КРИТИЧЕСКАЯ ОШИБКА: Нет работающего event loop! {e}")
+                    logger.critical("❌ КРИТИЧЕСКАЯ ОШИБКА: Нет работающего event loop! %s", e)
                     self._event_loop_warning_logged = True
                 return True
             # Для других RuntimeError тоже считаем проблемой
             if not self._event_loop_warning_logged:
-                logger.critical(f"❌ КРИТИЧЕСКАЯ ОШИБКА RuntimeError: {e}")
+                logger.critical("❌ КРИТИЧЕСКАЯ ОШИБКА RuntimeError: %s", e)
                 self._event_loop_warning_logged = True
             return True
         except Exception as e:
-            logger.error(f"⚠️  Неизвестная ошибка проверки event loop: {e}")
+            logger.error("⚠️  Неизвестная ошибка проверки event loop: %s", e)
             return False
 
     async def get_current_price(self, symbol: str) -> Tuple[Optional[float], str]:
@@ -46,30 +84,50 @@ class MultiExchangeAPI:
         if self._check_event_loop():
             return None, "Event loop closed"
 
-        for exchange_name, exchange_api in self.exchanges:
+        cached, located = self._get_cached_exchange(symbol)
+        if cached and located is None:
+            logger.debug("🚫 %s недавно не найден ни на одной бирже (кэш)", symbol)
+            return None, "None"
+
+        # Биржу, где символ уже находили, опрашиваем первой и без повторной проверки символа
+        exchanges = self.exchanges
+        if located:
+            exchanges = sorted(self.exchanges, key=lambda item: item[0] != located)
+
+        had_errors = False
+        for exchange_name, exchange_api in exchanges:
             try:
                 # Сначала проверяем валидность символа
-                if await exchange_api.is_symbol_valid(symbol):
+                if exchange_name == located or await exchange_api.is_symbol_valid(symbol):
                     price = await exchange_api.get_current_price(symbol)
                     if price and price > 0:
-                        logger.info(f"✅ {exchange_name}: Цена для {symbol} = {price}")
+                        logger.info("✅ %s: Цена для %s = %s", exchange_name, symbol, price)
                         # Сброс флага предупреждения если все работает
                         self._event_loop_warning_logged = False
+                        self._cache_exchange(symbol, exchange_name)
                         return price, exchange_name
                     else:
-                        logger.warning(f"⚠️ {exchange_name}: Не удалось получить цену для {symbol}")
+                        had_errors = True
+                        logger.warning("⚠️ %s: Не удалось получить цену для %s", exchange_name, symbol)
             except RuntimeError as e:
-                if "Event loop is closed" in str(e) or "no running event loop" in str(e):
-                    logger.critical(f"❌ {exchange_name}: КРИТИЧЕСКАЯ ОШИБКА - Event loop закрыт для {symbol}")
+                if is_loop_closed_error(e):
+                    logger.critical("❌ %s: КРИТИЧЕСКАЯ ОШИБКА - Event loop закрыт для %s", exchange_name, symbol)
                     return None, "Event loop closed"
                 else:
-                    logger.error(f"❌ {exchange_name}: RuntimeError для {symbol}: {e}")
+                    had_errors = True
+                    logger.error("❌ %s: RuntimeError для %s: %s", exchange_name, symbol, e)
                     continue
             except Exception as e:
-                logger.error(f"❌ {exchange_name}: Ошибка для {symbol}: {e}")
+                had_errors = True
+                logger.error("❌ %s: Ошибка для %s: %s", exchange_name, symbol, e)
                 continue
 
-        logger.error(f"🚫 Все биржи: Не удалось получить цену для {symbol}")
+        # Кэшируем отрицательный результат, только если все биржи ответили "нет" по загруженным
+        # спискам символов: REST-проверка отвечает False и на 5xx/таймаут, такой отказ не кэшируем
+        if not had_errors and self._symbols_loaded():
+            self._cache_exchange(symbol, None)
+
+        logger.error("🚫 Все биржи: Не удалось получить цену для %s", symbol)
         return None, "None"
 
     async def is_symbol_available(self, symbol: str) -> Tuple[bool, str]:
@@ -78,34 +136,58 @@ class MultiExchangeAPI:
         if self._check_event_loop():
             return False, "Event loop closed"
 
+        cached, located = self._get_cached_exchange(symbol)
+        if cached:
+            return (True, located) if located else (False, "None")
+
+        had_errors = False
         for exchange_name, exchange_api in self.exchanges:
             try:
                 if await exchange_api.is_symbol_valid(symbol):
-                    logger.info(f"✅ {exchange_name}: Символ {symbol} доступен")
+                    logger.info("✅ %s: Символ %s доступен", exchange_name, symbol)
                     # Сброс флага предупреждения если все работает
                     self._event_loop_warning_logged = False
+                    self._cache_exchange(symbol, exchange_name)
                     return True, exchange_name
             except RuntimeError as e:
-                if "Event loop is closed" in str(e) or "no running event loop" in str(e):
-                    logger.critical(f"❌ {exchange_name}: КРИТИЧЕСКАЯ ОШИБКА - Event loop закрыт при проверке {symbol}")
+                if is_loop_closed_error(e):
+                    logger.critical("❌ %s: КРИТИЧЕСКАЯ ОШИБКА - Event loop закрыт при проверке %s",
+                                    exchange_name, symbol)
                     return False, "Event loop closed"
                 else:
-                    logger.error(f"❌ {exchange_name}: RuntimeError проверки {symbol}: {e}")
+                    had_errors = True
+                    logger.error("❌ %s: RuntimeError проверки %s: %s", exchange_name, symbol, e)
                     continue
             except Exception as e:
-                logger.error(f"❌ {exchange_name}: Ошибка проверки {symbol}: {e}")
+                had_errors = True
+                logger.error("❌ %s: Ошибка проверки %s: %s", exchange_name, symbol, e)
                 continue
 
-        logger.error(f"🚫 Все биржи: Символ {symbol} недоступен")
+        if not had_errors and self._symbols_loaded():
+            self._cache_exchange(symbol, None)
+
+        logger.error("🚫 Все биржи: Символ %s недоступен", symbol)
         return False, "None"
 
+    async def refresh_symbols(self):
+        """Перезагружает списки символов всех бирж"""
+        results = await asyncio.gather(
+            *(exchange_api.load_symbols() for _, exchange_api in self.exchanges),
+            return_exceptions=True
+        )
+        for (exchange_name, _), result in zip(self.exchanges, results):
+            if result is not True:
+                logger.warning("⚠️ %s: Список символов не обновлен, используем REST-проверку", exchange_name)
+
     async def close(self):
         """Закрывает все сессии"""
+        # Клиенты только отпускают ссылку на общую сессию - закрываем ее один раз здесь
         for _, exchange_api in self.exchanges:
-            try:
-                await exchange_api.close()
-            except:
-                pass
+            await exchange_api.close()
+        try:
+            await close_shared_session()
+        except Exception as e:
+            logger.warning("⚠️ Ошибка закрытия сессии: %s", e)
 
 
 # Глобальный экземпляр
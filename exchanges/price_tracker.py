@@ -0,0 +1,160 @@
+import aiohttp
+import asyncio
+import logging
+import time
+from typing import Optional, Dict
+from .utils import json_loads, get_shared_session, raise_for_rate_limit, RateLimitError
+
+logger = logging.getLogger(__name__)
+
+
+class PriceTracker:
+    """Поток цен Binance через один WebSocket (!miniTicker@arr) вместо REST-запросов на каждый тик.
+    Пока поток недоступен, цены всех символов подтягиваются одним запросом /ticker/price"""
+
+    def __init__(self):
+        self.stream_url = "wss://stream.binance.com:9443/stream?streams=!miniTicker@arr"
+        self.snapshot_url = "https://api.binance.com/api/v3/ticker/price"
+        self.snapshot_interval = 2  # секунд между снимками цен без WebSocket
+        self.max_ban_delay = 300  # Потолок паузы снимков после 429/418 без Retry-After
+        self.connected = False
+        self.exchange_name = "Binance"
+        self.last_price: Dict[str, float] = {}
+        self.last_update: Dict[str, float] = {}
+        self.max_age = 30  # секунд, после которых цена считается устаревшей
+        self.reconnect_delay = 5
+        self._tick: Optional[asyncio.Event] = None  # Срабатывает на каждый пакет цен
+        self._task: Optional[asyncio.Task] = None
+        self._snapshot_task: Optional[asyncio.Task] = None
+
+    def start(self) -> asyncio.Task:
+        """Запускает фоновое чтение потока (если еще не запущено)"""
+        if self._task is None or self._task.done():
+            # Событие привязано к циклу событий, поэтому при перезапуске создаем его заново
+            self._tick = None
+            self._task = asyncio.create_task(self._run())
+        if self._snapshot_task is None or self._snapshot_task.done():
+            self._snapshot_task = asyncio.create_task(self._poll_snapshots())
+        return self._task
+
+    def get_price(self, symbol: str) -> Optional[float]:
+        """Возвращает последнюю цену из потока или None, если ее нет или она устарела"""
+        updated = self.last_update.get(symbol)
+        if updated is None or time.monotonic() - updated > self.max_age:
+            return None
+        return self.last_price.get(symbol)
+
+    async def wait_for_tick(self, timeout: float) -> bool:
+        """Ждет следующего пакета цен (кадра потока или снимка). False - если его не было за timeout секунд"""
+        if self._tick is None:
+            self._tick = asyncio.Event()
+
+        try:
+            await asyncio.wait_for(self._tick.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _notify_tick(self):
+        """Будит всех, кто ждет пакет цен"""
+        if self._tick is not None:
+            self._tick.set()
+            self._tick.clear()
+
+    async def _run(self):
+        """Держит подключение к потоку, переподключаясь при обрывах"""
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("❌ WebSocket Binance: ошибка потока цен: %s", e)
+
+            logger.warning("🔄 WebSocket Binance: переподключение через %s сек", self.reconnect_delay)
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _listen(self):
+        """Читает кадры потока до закрытия соединения"""
+        # Соединение берем из общей сессии: ее пул, DNS-кеш и закрытие - те же, что у REST-клиентов
+        async with get_shared_session().ws_connect(self.stream_url, heartbeat=30) as ws:
+            logger.info("✅ WebSocket Binance: поток цен подключен")
+            self.connected = True
+            try:
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        self._handle_frame(msg.data)
+                    elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                        break
+            finally:
+                self.connected = False
+
+    async def _poll_snapshots(self):
+        """Пока WebSocket отключен, обновляет цены всех символов одним REST-запросом"""
+        ban_delay = 0
+        while True:
+            delay = self.snapshot_interval
+            if not self.connected:
+                try:
+                    await self._fetch_snapshot()
+                    ban_delay = 0
+                except asyncio.CancelledError:
+                    raise
+                except RateLimitError as e:
+                    # Во время бана не опрашиваем: каждый запрос снимка только продлевает его
+                    ban_delay = min(max(ban_delay * 2, self.snapshot_interval * 2), self.max_ban_delay)
+                    delay = e.retry_after if e.retry_after is not None else ban_delay
+                    logger.warning("⛔ Binance: лимит запросов (HTTP %s), снимки цен приостановлены на %.0f сек",
+                                   e.status, delay)
+                except Exception as e:
+                    logger.warning("⚠️  Binance: не удалось получить снимок цен: %s", e)
+            await asyncio.sleep(delay)
+
+    async def _fetch_snapshot(self):
+        """Загружает цены всех символов из /ticker/price"""
+        session = get_shared_session()
+        async with session.get(self.snapshot_url) as response:
+            raise_for_rate_limit(response)
+            if response.status != 200:
+                return
+            tickers = await response.json(loads=json_loads)
+
+        now = time.monotonic()
+        for ticker in tickers:
+            self._store(ticker.get('symbol'), ticker.get('price'), now)
+        self._notify_tick()
+
+    def _handle_frame(self, raw: str):
+        """Раскладывает кадр miniTicker по словарю последних цен"""
+        payload = json_loads(raw)
+        tickers = payload.get('data', []) if isinstance(payload, dict) else payload
+        now = time.monotonic()
+
+        for ticker in tickers:
+            self._store(ticker.get('s'), ticker.get('c'), now)
+        self._notify_tick()
+
+    def _store(self, symbol: Optional[str], price, now: float):
+        """Сохраняет цену символа"""
+        if not symbol or not price:
+            return
+
+        self.last_price[symbol] = float(price)
+        self.last_update[symbol] = now
+
+    async def close(self):
+        """Останавливает поток и опрос снимков"""
+        for task in (self._task, self._snapshot_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._task = None
+        self._snapshot_task = None
+        self.connected = False
+
+
+# Глобальный экземпляр
+price_tracker = PriceTracker()
@@ -0,0 +1,113 @@
+import aiohttp
+import asyncio
+import json
+import logging
+from functools import wraps
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# orjson разбирает JSON в несколько раз быстрее stdlib; без него работаем на json
+try:
+    import orjson
+
+    json_loads = orjson.loads
+    HAS_ORJSON = True
+except ImportError:
+    json_loads = json.loads
+    HAS_ORJSON = False
+
+# Одна HTTP-сессия на все биржевые клиенты: keep-alive соединения и DNS-кеш общие
+_shared_session: Optional[aiohttp.ClientSession] = None
+
+# Коды, которыми биржи сообщают о превышении лимита запросов (418 - временный бан Binance)
+RATE_LIMIT_STATUSES = (418, 429)
+
+# Тексты RuntimeError, которыми asyncio сообщает о закрытом/отсутствующем цикле событий
+_LOOP_CLOSED_MESSAGES = ("Event loop is closed", "no running event loop")
+
+
+class RateLimitError(Exception):
+    """Биржа ограничила частоту запросов"""
+
+    def __init__(self, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status}, Retry-After: {retry_after}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def raise_for_rate_limit(response: aiohttp.ClientResponse):
+    """Бросает RateLimitError, если ответ биржи - 429/418"""
+    if response.status not in RATE_LIMIT_STATUSES:
+        return
+
+    retry_after = None
+    header = response.headers.get('Retry-After')
+    if header:
+        try:
+            retry_after = float(header)
+        except ValueError:
+            pass
+
+    raise RateLimitError(response.status, retry_after)
+
+
+def is_loop_closed_error(error: BaseException) -> bool:
+    """RuntimeError из-за закрытого цикла событий (после нее работа бота невозможна)"""
+    message = error.args[0] if error.args else ''
+    return isinstance(message, str) and any(text in message for text in _LOOP_CLOSED_MESSAGES)
+
+
+def retry_with_backoff(max_retries: int = 2, base_delay: float = 1.0, max_delay: float = 2.0):
+    """Декоратор: повторяет запрос с экспоненциальной задержкой при 429/418 и сетевых ошибках
+
+    Задержка ограничена парой секунд: вызывающий код держит слот PriceCache, а более долгое
+    ожидание дешевле пересидеть до следующего тика мониторинга
+    """
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            attempt = 0
+            while True:
+                try:
+                    return await func(*args, **kwargs)
+                except (RateLimitError, aiohttp.ClientError) as e:
+                    if attempt >= max_retries:
+                        raise
+
+                    delay = base_delay * (2 ** attempt)
+                    if isinstance(e, RateLimitError) and e.retry_after is not None:
+                        delay = e.retry_after
+
+                    # Долгий бан не пересиживаем - пусть вызывающий код переключится на другую биржу
+                    # или повторит на следующем тике
+                    if delay > max_delay:
+                        raise
+
+                    attempt += 1
+                    logger.warning("⏳ %s: %s, повтор #%d через %.1f сек", func.__qualname__, e, attempt, delay)
+                    await asyncio.sleep(delay)
+
+        return wrapper
+
+    return decorator
+
+
+def get_shared_session() -> aiohttp.ClientSession:
+    """Создает или возвращает общую сессию с пулом keep-alive соединений"""
+    global _shared_session
+    if _shared_session is None or _shared_session.closed:
+        connector = aiohttp.TCPConnector(limit=256, limit_per_host=64, ttl_dns_cache=300, keepalive_timeout=75)
+        # Зависший запрос не должен держать слот PriceCache до 5-минутного таймаута aiohttp по умолчанию
+        timeout = aiohttp.ClientTimeout(total=10)
+        _shared_session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+    return _shared_session
+
+
+async def close_shared_session():
+    """Закрывает общую сессию (в том числе если ее использовал только поток цен)"""
+    global _shared_session
+    if _shared_session is not None and not _shared_session.closed:
+        await _shared_session.close()
+    _shared_session = None
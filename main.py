@@ -1,22 +1,60 @@
 import asyncio
+import atexit
 import logging
+import logging.handlers
+import queue
 import signal
 import sys
 import time
 from bot.telethon_bot import run_telethon_bot
 from web.app import start_web_interface
 from exchanges.multi_exchange import multi_exchange
+from exchanges.price_tracker import price_tracker
+
+# uvloop (libuv) заметно быстрее стандартного цикла событий на сетевой нагрузке
+try:
+    import uvloop
+
+    HAS_UVLOOP = True
+except ImportError:
+    HAS_UVLOOP = False
+
+
+def setup_logging():
+    """Логи пишет фоновый поток: цикл событий только кладет запись в очередь"""
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+
+    # Обработчики, которые модули уже повесили при импорте (консоль и app.log из web.app),
+    # переносим за очередь, а не выбрасываем
+    handlers = root.handlers[:]
+    if not handlers:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        handlers.append(stream_handler)
+    for handler in handlers:
+        root.removeHandler(handler)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # Дописываем хвост очереди при выходе
+
+    # В очередь кладем только текст сообщения - полный формат применит поток-слушатель
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+
+    root.addHandler(queue_handler)
+    root.setLevel(logging.INFO)
+
 
 # Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging()
 
 
 async def shutdown():
     """Корректное завершение работы"""
     print("🔄 Завершаем работу...")
+    await price_tracker.close()
     await multi_exchange.close()
     sys.exit(0)
 
@@ -30,6 +68,11 @@ def main():
     print("🚀 Запускаем Trading Bot + Web Dashboard...")
     print("🔧 Мульти-биржа: Binance + BingX")
 
+    if HAS_UVLOOP:
+        # Политика действует на все последующие asyncio.run, включая перезапуски
+        uvloop.install()
+        print("⚡ Цикл событий: uvloop")
+
     # Регистрируем обработчики сигналов
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
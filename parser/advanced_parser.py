@@ -7,10 +7,27 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
-
-@dataclass
+# Шаблон итогового лога парсера: одна запись вместо дюжины вызовов logger.info
+_FINAL_SIGNAL_LOG = (
+    "✅ ФИНАЛЬНЫЙ СИГНАЛ:\n"
+    "   Символ: %s\n"
+    "   Направление: %s\n"
+    "   Входы: %s\n"
+    "   Лимитные входы: %s\n"
+    "   Тейки: %s\n"
+    "   Стоп: %s\n"
+    "   Плечо: %s\n"
+    "   Маржа: %s\n"
+    "   Источник: %s\n"
+    "   Рыночный вход: %s\n"
+    "   Время: %s\n"
+    + "-" * 60
+)
+
+
+@dataclass(slots=True)
 class TradeSignal:
-    """Класс для хранения торгового сигнала"""
+    """Класс для хранения торгового сигнала (slots: без __dict__ на каждый экземпляр)"""
     symbol: str = "UNKNOWN"
     direction: str = "UNKNOWN"  # LONG или SHORT
     entry_prices: List[float] = field(default_factory=list)
@@ -21,11 +38,13 @@ class TradeSignal:
     margin: Optional[float] = None
     source: str = "Unknown"
     timestamp: float = field(default_factory=time.time)
+    monotonic_start: float = field(default_factory=time.monotonic)  # Для длительности сделки (не зависит от NTP)
     is_market: bool = False
     entry_executed: bool = False
     original_text: str = ""
     risk_level: Optional[str] = None
     confidence: Optional[int] = None
+    next_tp: int = 0  # Индекс следующего недостигнутого тейка (тейки отсортированы по ходу сделки)
 
 
 class AdvancedParser:
@@ -53,7 +72,7 @@ class AdvancedParser:
         if not take_profits or not entry_price:
             return take_profits
 
-        logger.info(f"Фильтруем тейк-профиты: direction={direction}, entry={entry_price}, tps={take_profits}")
+        logger.info("Фильтруем тейк-профиты: direction=%s, entry=%s, tps=%s", direction, entry_price, take_profits)
 
         if direction == "LONG":
             filtered = [tp for tp in take_profits if tp > entry_price]
@@ -84,7 +103,7 @@ class AdvancedParser:
             if match:
                 start_pos = match.start()
                 start_keyword = 'По целям:'
-                logger.debug(f"Найден специальный паттерн Nesterov Family: '{start_keyword}' на позиции {start_pos}")
+                logger.debug("Найден специальный паттерн Nesterov Family: '%s' на позиции %s", start_keyword, start_pos)
 
         if start_pos == -1:
             # Обычный поиск по ключевым словам
@@ -101,7 +120,7 @@ class AdvancedParser:
             logger.debug("Не найден блок тейк-профитов в тексте")
             return None
 
-        logger.debug(f"Найден стартовый ключ '{start_keyword}' на позиции {start_pos}")
+        logger.debug("Найден стартовый ключ '%s' на позиции %s", start_keyword, start_pos)
 
         # Ищем конец блока тейк-профитов
         end_pos = len(text)
@@ -113,7 +132,7 @@ class AdvancedParser:
                 pos = text_lower.find(keyword, start_pos + len('По целям:'))
                 if pos != -1 and pos < end_pos:
                     end_pos = pos
-                    logger.debug(f"Найден конечный ключ для Nesterov: '{keyword}' на позиции {pos}")
+                    logger.debug("Найден конечный ключ для Nesterov: '%s' на позиции %s", keyword, pos)
                     break
         else:
             # Обычный поиск конца блока
@@ -122,7 +141,7 @@ class AdvancedParser:
                 pos = text_lower.find(keyword, start_pos + len(start_keyword))
                 if pos != -1 and pos < end_pos:
                     end_pos = pos
-                    logger.debug(f"Найден конечный ключ '{keyword}' на позиции {pos}")
+                    logger.debug("Найден конечный ключ '%s' на позиции %s", keyword, pos)
 
         # Также ищем конец строки как альтернативный конец блока
         # Ищем перенос строки или знак конца сообщения
@@ -130,7 +149,7 @@ class AdvancedParser:
             pos = text.find(end_marker, start_pos)
             if pos != -1 and pos < end_pos:
                 end_pos = pos
-                logger.debug(f"Используем '{end_marker}' как конец блока на позиции {pos}")
+                logger.debug("Используем '%s' как конец блока на позиции %s", end_marker, pos)
 
         # Извлекаем блок
         block = text[start_pos:end_pos].strip()
@@ -144,7 +163,7 @@ class AdvancedParser:
         # Убираем знаки препинания в начале блока
         block = re.sub(r'^[:\-—\s]+', '', block)
 
-        logger.debug(f"Извлеченный блок тейк-профитов: '{block}'")
+        logger.debug("Извлеченный блок тейк-профитов: '%s'", block)
         return block
 
     @staticmethod
@@ -155,7 +174,7 @@ class AdvancedParser:
         if not block:
             return []
 
-        logger.debug(f"Парсим тейк-профиты из блока: '{block}'")
+        logger.debug("Парсим тейк-профиты из блока: '%s'", block)
 
         # Заменяем запятые на точки в десятичных числах (0,1202 → 0.1202)
         block = re.sub(r'(\d),(\d)', r'\1.\2', block)
@@ -174,11 +193,11 @@ class AdvancedParser:
                     try:
                         price = float(clean_part)
                         take_profits.append(price)
-                        logger.debug(f"Найден тейк-профит (через запятую): {price}")
+                        logger.debug("Найден тейк-профит (через запятую): %s", price)
                     except ValueError:
-                        logger.debug(f"Не удалось преобразовать '{clean_part}' в число")
+                        logger.debug("Не удалось преобразовать '%s' в число", clean_part)
             if take_profits:
-                logger.info(f"Найдено тейк-профитов (через запятую): {len(take_profits)}")
+                logger.info("Найдено тейк-профитов (через запятую): %s", len(take_profits))
                 return take_profits
 
         # Обычная обработка для других форматов
@@ -186,7 +205,7 @@ class AdvancedParser:
         cleaned_block = re.sub(r'[^\d\s.\-/|—,]', ' ', block)
         cleaned_block = re.sub(r'\s+', ' ', cleaned_block).strip()
 
-        logger.debug(f"Очищенный блок: '{cleaned_block}'")
+        logger.debug("Очищенный блок: '%s'", cleaned_block)
 
         # Разделяем на токены
         tokens = re.split(r'[\s—\-/,|]+', cleaned_block)
@@ -204,12 +223,12 @@ class AdvancedParser:
                 try:
                     price = float(num_str)
                     take_profits.append(price)
-                    logger.debug(f"Найден тейк-профит: {price}")
+                    logger.debug("Найден тейк-профит: %s", price)
                 except ValueError:
-                    logger.debug(f"Не удалось преобразовать '{num_str}' в число")
+                    logger.debug("Не удалось преобразовать '%s' в число", num_str)
                     continue
 
-        logger.info(f"Найдено тейк-профитов: {len(take_profits)}")
+        logger.info("Найдено тейк-профитов: %s", len(take_profits))
         return take_profits
     @staticmethod
     def parse_take_profits(text: str) -> List[float]:
@@ -289,10 +308,10 @@ class AdvancedParser:
 
                 # Проверяем, не является ли запрещенным словом
                 if normalize_symbol(symbol.replace('USDT', '')) in FORBIDDEN:
-                    logger.debug(f"Символ {symbol} в списке запрещенных, пропускаем")
+                    logger.debug("Символ %s в списке запрещенных, пропускаем", symbol)
                     continue
 
-                logger.info(f"Извлечен символ (паттерн: {pattern[:50]}...): {symbol}")
+                logger.info("Извлечен символ (паттерн: %s...): %s", pattern[:50], symbol)
                 return symbol
 
         # 2. Специальный паттерн для "Avax Short" - только если в строке нет других символов
@@ -312,7 +331,7 @@ class AdvancedParser:
                         # Исключаем случаи, где candidate это часть USDT пары
                         if not line_up.endswith('USDT') and candidate != 'USDT':
                             symbol = f"{candidate}USDT"
-                            logger.info(f"Извлечен символ (слово перед SHORT/LONG): {symbol} из строки: '{line}'")
+                            logger.info("Извлечен символ (слово перед SHORT/LONG): %s из строки: '%s'", symbol, line)
                             return symbol
 
         # 3. Fallback: ищем слово, которое похоже на тикер (2-10 букв)
@@ -325,7 +344,7 @@ class AdvancedParser:
                     common_words = {'THE', 'AND', 'FOR', 'ARE', 'NOT', 'ALL', 'BUT', 'FROM', 'WITH', 'YOU', 'ARE'}
                     if word not in common_words:
                         symbol = f"{word}USDT"
-                        logger.info(f"Извлечен символ (fallback слово): {symbol} из строки: '{line}'")
+                        logger.info("Извлечен символ (fallback слово): %s из строки: '%s'", symbol, line)
                         return symbol
 
         # 4. Fallback: из контекста торговых терминов
@@ -343,10 +362,10 @@ class AdvancedParser:
                     candidate = normalize_symbol(word)
                     if candidate not in FORBIDDEN and 2 <= len(candidate) <= 10:
                         symbol = f"{candidate}USDT"
-                        logger.info(f"Извлечен символ (контекст торговли): {symbol} из строки: '{line}'")
+                        logger.info("Извлечен символ (контекст торговли): %s из строки: '%s'", symbol, line)
                         return symbol
 
-        logger.warning(f"Символ не распознан в тексте: {text[:200]}...")
+        logger.warning("Символ не распознан в тексте: %s...", text[:200])
         return "UNKNOWN"
 
     @staticmethod
@@ -563,7 +582,7 @@ class AdvancedParser:
 
             if take_profit_match:
                 tp_str = take_profit_match.group(1).strip()
-                logger.info(f"Найден блок тейк-профитов для Nesterov: '{tp_str}'")
+                logger.info("Найден блок тейк-профитов для Nesterov: '%s'", tp_str)
 
                 # Извлекаем все числа (формат: 5.307, 5.255, 5.200, 5.143)
                 take_profits = []
@@ -589,7 +608,7 @@ class AdvancedParser:
 
                 if take_profits:
                     result['take_profits'] = take_profits
-                    logger.info(f"Найдены тейк-профиты для Nesterov: {take_profits}")
+                    logger.info("Найдены тейк-профиты для Nesterov: %s", take_profits)
 
             stop_match = re.search(r'Стоп:\s*([\d.,]+)', text)
             if stop_match:
@@ -713,18 +732,19 @@ class AdvancedParser:
         Парсит торговый сигнал из текста сообщения
         """
         # Логируем входящий текст для отладки
-        logger.info(f"Парсим сигнал из источника '{source}': {text[:200]}...")
+        logger.info("Парсим сигнал из источника '%s': %s...", source, text[:200])
 
         signal = TradeSignal()
         signal.source = source
         signal.timestamp = time.time()
+        signal.monotonic_start = time.monotonic()
         signal.original_text = text
 
         # Определяем символ с улучшенным детектором
         signal.symbol = AdvancedParser.extract_symbol(text)
 
         # Логируем результат извлечения символа
-        logger.info(f"Результат извлечения символа: {signal.symbol}")
+        logger.info("Результат извлечения символа: %s", signal.symbol)
 
         # Если символ UNKNOWN, пробуем дополнительные методы
         if signal.symbol == "UNKNOWN":
@@ -746,7 +766,7 @@ class AdvancedParser:
                                         clean_candidate = re.sub(r'^\d+', '', candidate)
                                         if 2 <= len(clean_candidate) <= 10:
                                             signal.symbol = f"{clean_candidate}USDT"
-                                            logger.info(f"Извлечен символ из контекста Private Club: {signal.symbol}")
+                                            logger.info("Извлечен символ из контекста Private Club: %s", signal.symbol)
                                             break
                         if signal.symbol != "UNKNOWN":
                             break
@@ -778,11 +798,11 @@ class AdvancedParser:
             signal.is_market = True
 
         # Определяем тейк-профиты (повторно для логирования)
-        logger.info(f"После parse_take_profits: {signal.take_profits}")
+        logger.info("После parse_take_profits: %s", signal.take_profits)
 
         # Проверяем специфичные паттерны для источника
         source_specific_data = AdvancedParser.detect_source_specific_pattern(text, source)
-        logger.info(f"source_specific_data для {source}: {source_specific_data}")
+        logger.info("source_specific_data для %s: %s", source, source_specific_data)
 
         for key, value in source_specific_data.items():
             if hasattr(signal, key):
@@ -791,14 +811,14 @@ class AdvancedParser:
                     signal.entry_prices = value
                 # Для take_profits заменяем полностью
                 elif key == 'take_profits' and value:
-                    logger.info(f"ПЕРЕЗАПИСЫВАЕМ take_profits: {value}")
+                    logger.info("ПЕРЕЗАПИСЫВАЕМ take_profits: %s", value)
                     signal.take_profits = value
                 elif key == 'stop_loss' and value:
                     signal.stop_loss = value
                 elif key == 'limit_prices' and value:
                     signal.limit_prices = value
 
-        logger.info(f"После source_specific_data: {signal.take_profits}")
+        logger.info("После source_specific_data: %s", signal.take_profits)
 
         # 🔥 ВАЖНОЕ ИЗМЕНЕНИЕ: ФИЛЬТРАЦИЯ ТЕЙК-ПРОФИТОВ ПО ЦЕНЕ ВХОДА
         # Но только если тейк-профитов больше 0
@@ -821,7 +841,7 @@ class AdvancedParser:
                 signal.take_profits = filtered_tps
 
             if len(signal.take_profits) != original_count:
-                logger.info(f"Отфильтрованы тейк-профиты: было {original_count}, стало {len(signal.take_profits)}")
+                logger.info("Отфильтрованы тейк-профиты: было %s, стало %s", original_count, len(signal.take_profits))
 
         # Для CryptoFutures: если есть limit_prices и нет entry_prices, копируем
         if "CryptoFutures" in source and signal.limit_prices and not signal.entry_prices:
@@ -864,23 +884,17 @@ class AdvancedParser:
 
                 if len(filtered_tps) != len(signal.take_profits):
                     logger.info(
-                        f"Убраны тейк-профиты слишком близкие к входу: было {len(signal.take_profits)}, стало {len(filtered_tps)}")
+                        "Убраны тейк-профиты слишком близкие к входу: было %s, стало %s",
+                        len(signal.take_profits), len(filtered_tps))
                     signal.take_profits = filtered_tps
 
-        # Логируем финальный результат
-        logger.info(f"✅ ФИНАЛЬНЫЙ СИГНАЛ:")
-        logger.info(f"   Символ: {signal.symbol}")
-        logger.info(f"   Направление: {signal.direction}")
-        logger.info(f"   Входы: {signal.entry_prices}")
-        logger.info(f"   Лимитные входы: {signal.limit_prices}")
-        logger.info(f"   Тейки: {signal.take_profits}")
-        logger.info(f"   Стоп: {signal.stop_loss}")
-        logger.info(f"   Плечо: {signal.leverage}")
-        logger.info(f"   Маржа: {signal.margin}")
-        logger.info(f"   Источник: {signal.source}")
-        logger.info(f"   Рыночный вход: {signal.is_market}")
-        logger.info(f"   Время: {datetime.fromtimestamp(signal.timestamp).strftime('%H:%M:%S')}")
-        logger.info("-" * 60)
+        # Логируем финальный результат одной записью
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(_FINAL_SIGNAL_LOG,
+                        signal.symbol, signal.direction, signal.entry_prices, signal.limit_prices,
+                        signal.take_profits, signal.stop_loss, signal.leverage, signal.margin,
+                        signal.source, signal.is_market,
+                        datetime.fromtimestamp(signal.timestamp).strftime('%H:%M:%S'))
 
         return signal
 
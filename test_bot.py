@@ -0,0 +1,198 @@
+"""Тесты бота без сети и без Telegram.
+
+Нужны зависимости бота: telethon, aiohttp, flask и локальный config_telethon.py.
+Без них тесты пропускаются. Запуск: python -m pytest -q test_bot.py
+"""
+import asyncio
+import time
+
+import pytest
+
+for _module in ("telethon", "aiohttp", "flask", "config_telethon"):
+    pytest.importorskip(_module)
+
+from bot.telethon_bot import TelethonTradingBot, PriceCache, _parse_price_list  # noqa: E402
+from exchanges.multi_exchange import multi_exchange  # noqa: E402
+from parser.advanced_parser import TradeSignal  # noqa: E402
+
+
+# Списки цен для /editsignal
+price_list_cases = [
+    ("[1,2,3]", [1.0, 2.0, 3.0]),
+    ("[0.02761, 0.02788]", [0.02761, 0.02788]),
+    ("[.5]", [0.5]),
+    ("[5.]", [5.0]),
+    ("[-.5, 1.25]", [-0.5, 1.25]),
+    ("[5.e3]", [5000.0]),
+    ("[+5]", [5.0]),
+    ("[05000]", [5000.0]),
+    ("[+0.5, -05]", [0.5, -5.0]),
+    ("[0, 0.05]", [0.0, 0.05]),
+    ("[1_000]", [1000.0]),
+    ("[1e+3]", [1000.0]),
+    ("[inf]", None),
+    ("[Infinity]", None),
+    ("[NaN]", None),
+    ("[true]", None),
+    ("[1,false]", None),
+    ('[1,"2"]', None),
+    ("[1,null]", None),
+    ("[[1]]", None),
+    ("[]", None),
+    ("5", None),
+    ('{"tp": 1}', None),
+    ("[1,2", None),
+    ("abc", None),
+]
+
+
+@pytest.mark.parametrize("value_str, expected", price_list_cases)
+def test_parse_price_list(value_str, expected):
+    assert _parse_price_list(value_str) == expected
+
+
+# Тейк-профиты и стоп в цикле мониторинга
+def make_bot():
+    """Бот без клиента Telethon: только то, что нужно циклу мониторинга"""
+    bot = TelethonTradingBot.__new__(TelethonTradingBot)
+    bot.active_signals = {}
+    bot._signals_by_symbol = {}
+    bot._price_failures = {}
+    bot._signal_updates = []
+    bot._web_signals = {}
+    bot._price_updates = {}
+    bot.max_price_failure_time = 50
+    bot.closed = []
+
+    # Историю в файл не пишем - только запоминаем причину закрытия
+    async def save_to_history(signal_id, close_reason, close_price):
+        bot.closed.append((signal_id, close_reason))
+        bot._remove_active_signal(signal_id)
+
+    bot.save_to_history = save_to_history
+    return bot
+
+
+def make_signal(direction, take_profits, stop_loss):
+    signal = TradeSignal()
+    signal.symbol = "TESTUSDT"
+    signal.direction = direction
+    signal.entry_prices = [100.0]
+    signal.take_profits = list(take_profits)
+    signal.stop_loss = stop_loss
+    signal.timestamp = time.time()
+    return signal
+
+
+async def run_ticks(direction, take_profits, stop_loss, prices):
+    """Прогоняет цены через _evaluate_signal и возвращает указатели после каждого тика и закрытия"""
+    bot = make_bot()
+    signal = make_signal(direction, take_profits, stop_loss)
+    signal_id = bot._add_active_signal(signal)
+    pointers = []
+    for price in prices:
+        await bot._evaluate_signal(signal_id, price, "Binance")
+        pointers.append(signal.next_tp)
+    return signal, pointers, bot.closed
+
+
+tp_cases = [
+    pytest.param(("LONG", [110, 105, 120], 90, [104, 105, 112, 121]), [105, 110, 120], [0, 1, 2, 3],
+                 "all_take_profits", id="long-one-by-one"),
+    pytest.param(("LONG", [105, 110, 120], 90, [111]), [105, 110, 120], [2], None, id="long-gap-two"),
+    pytest.param(("LONG", [105, 110, 120], 90, [130]), [105, 110, 120], [3], "all_take_profits",
+                 id="long-gap-all"),
+    pytest.param(("LONG", [105, 110], 90, [106, 89]), [105, 110], [1, 1], "stop_loss", id="long-stop-loss"),
+    pytest.param(("SHORT", [90, 95, 80], 110, [96, 95, 88, 79]), [95, 90, 80], [0, 1, 2, 3],
+                 "all_take_profits", id="short-one-by-one"),
+    pytest.param(("SHORT", [95, 90, 80], 110, [85]), [95, 90, 80], [2], None, id="short-gap-two"),
+    pytest.param(("SHORT", [95, 90, 80], 110, [70]), [95, 90, 80], [3], "all_take_profits",
+                 id="short-gap-all"),
+    pytest.param(("SHORT", [95, 90], 110, [101, 111]), [95, 90], [0, 0], "stop_loss", id="short-stop-loss"),
+]
+
+
+@pytest.mark.parametrize("args, take_profits, pointers, close_reason", tp_cases)
+def test_take_profit_pointer(args, take_profits, pointers, close_reason):
+    signal, got_pointers, closed = asyncio.run(run_ticks(*args))
+    assert signal.take_profits == take_profits
+    assert got_pointers == pointers
+    assert len(closed) <= 1
+    assert (closed[0][1] if closed else None) == close_reason
+
+
+set_take_profits_cases = [
+    pytest.param("LONG", [120, 105, 110], 111, [105, 110, 120], 2, id="long-two-passed"),
+    pytest.param("LONG", [105, 110], None, [105, 110], 0, id="long-no-price"),
+    pytest.param("SHORT", [80, 95, 90], 92, [95, 90, 80], 1, id="short-one-passed"),
+    pytest.param("SHORT", [95, 90], 100, [95, 90], 0, id="short-none-passed"),
+]
+
+
+@pytest.mark.parametrize("direction, values, price, take_profits, next_tp", set_take_profits_cases)
+def test_set_take_profits_keeps_passed_tps(direction, values, price, take_profits, next_tp):
+    signal = make_signal(direction, [100], 50)
+    TelethonTradingBot._set_take_profits(signal, values, price)
+    assert signal.take_profits == take_profits
+    assert signal.next_tp == next_tp
+
+
+# Один запрос к биржам на символ
+def test_price_cache_coalesces_misses(monkeypatch):
+    calls = []
+
+    async def fake_get_current_price(symbol):
+        calls.append(symbol)
+        await asyncio.sleep(0.05)
+        return 123.45, "Binance"
+
+    monkeypatch.setattr(multi_exchange, "get_current_price", fake_get_current_price)
+
+    async def run():
+        cache = PriceCache(ttl=5)
+        first, second = await asyncio.gather(cache.get_price("TESTUSDT"), cache.get_price("TESTUSDT"))
+        cached = await cache.get_price("TESTUSDT")
+        return first, second, cached, cache._pending
+
+    first, second, cached, pending = asyncio.run(run())
+    assert calls == ["TESTUSDT"]  # Два одновременных промаха - один запрос
+    assert first == second == (123.45, "Binance")
+    assert cached == (123.45, "Binance")  # Следующий запрос отдается из кэша
+    assert not pending  # Выполняющиеся запросы убраны
+
+
+# Отрицательный кэш символов
+class FakeExchange:
+    """Биржа без сети: символа нет, список символов загружен или нет"""
+
+    def __init__(self, symbols):
+        self.symbols = frozenset(symbols)
+
+    async def is_symbol_valid(self, symbol):
+        return symbol in self.symbols
+
+    async def get_current_price(self, symbol):
+        return None
+
+
+def run_negative_lookup(monkeypatch, symbols):
+    monkeypatch.setattr(multi_exchange, "exchanges",
+                        [("Binance", FakeExchange(symbols)), ("BingX", FakeExchange(symbols))])
+    monkeypatch.setattr(multi_exchange, "_symbol_exchange_cache", type(multi_exchange._symbol_exchange_cache)())
+    asyncio.run(multi_exchange.get_current_price("NOPEUSDT"))
+    return multi_exchange._get_cached_exchange("NOPEUSDT")
+
+
+def test_rest_refusal_is_not_cached(monkeypatch):
+    # Списки не загружены - отказ мог быть сетевой ошибкой
+    cached, _ = run_negative_lookup(monkeypatch, [])
+    assert not cached
+
+
+def test_refusal_from_loaded_lists_is_cached(monkeypatch):
+    cached, located = run_negative_lookup(monkeypatch, ["BTCUSDT"])
+    assert cached and located is None
+
+
+def test_negative_cache_shorter_than_failure_window():
+    assert multi_exchange.symbol_cache_negative_ttl < make_bot().max_price_failure_time
@@ -7,6 +7,7 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from collections import defaultdict
+from dataclasses import dataclass, field
 from functools import lru_cache
 import traceback
 from functools import wraps
@@ -36,6 +37,58 @@ class Config:
 config = Config()
 
 
+@dataclass(slots=True)
+class SignalData:
+    """Снимок активного сигнала для веб-интерфейса"""
+    signal_id: Any
+    symbol: str
+    direction: str
+    entry_prices: List[float]
+    limit_prices: List[float]
+    take_profits: List[float]
+    stop_loss: Optional[float]
+    leverage: Optional[int]
+    margin: Optional[float]
+    source: str
+    timestamp: float
+    pnl_percent: Optional[float] = 0
+    reached_tps: List[int] = field(default_factory=list)
+    exchange: str = 'Unknown'
+    current_price: Optional[float] = None
+    entry_executed: bool = False
+    is_market: bool = False
+
+    @classmethod
+    def from_signal(cls, signal_id, signal, **state) -> "SignalData":
+        """Собирает снимок из торгового сигнала; state - текущее состояние (PnL, биржа, цена...)"""
+        state.setdefault('entry_executed', signal.entry_executed)
+        return cls(
+            signal_id=signal_id,
+            symbol=signal.symbol,
+            direction=signal.direction,
+            entry_prices=signal.entry_prices,
+            limit_prices=signal.limit_prices,
+            take_profits=signal.take_profits,
+            stop_loss=signal.stop_loss,
+            leverage=signal.leverage,
+            margin=signal.margin,
+            source=signal.source,
+            timestamp=signal.timestamp,
+            is_market=signal.is_market,
+            **state
+        )
+
+    def set_state(self, pnl_percent: Optional[float], reached_count: int, exchange: str,
+                  current_price: Optional[float], entry_executed: bool):
+        """Обновляет изменяемую часть снимка на месте (под блокировкой TradingData)"""
+        self.pnl_percent = pnl_percent
+        if len(self.reached_tps) != reached_count:
+            self.reached_tps = list(range(reached_count))
+        self.exchange = exchange
+        self.current_price = current_price
+        self.entry_executed = entry_executed
+
+
 # Глобальное хранилище для данных с потокобезопасностью
 class TradingData:
     def __init__(self):
@@ -194,21 +247,37 @@ class TradingData:
                 logger.info(f"Очищена история: {removed_count} старых сделок")
                 self._invalidate_cache()
 
-    def update_signal_data(self, signal_data: Dict[str, Any]):
+    def update_signal_data(self, signal_data: SignalData):
         """Обновляет данные сигнала для веб-интерфейса"""
         with self._acquire_lock():
-            signal_id = signal_data.get('signal_id')
+            signal_id = signal_data.signal_id
             if signal_id:
                 # Валидация timestamp
-                if 'timestamp' not in signal_data:
-                    signal_data['timestamp'] = time.time()
+                if not signal_data.timestamp:
+                    signal_data.timestamp = time.time()
 
                 self.active_signals[signal_id] = signal_data
                 self.last_update = time.time()
 
-                symbol = signal_data.get('symbol', 'Unknown')
-                pnl = signal_data.get('pnl_percent', 0)
-                logger.info(f"Обновлены данные сигнала {signal_id}: символ={symbol}, PnL={pnl}")
+                logger.info("Обновлены данные сигнала %s: символ=%s, PnL=%s",
+                            signal_id, signal_data.symbol, signal_data.pnl_percent)
+
+    def bulk_update(self, signals: List[tuple], prices: Dict[str, Dict[str, Any]]):
+        """Обновляет данные пачки сигналов и цен за один захват блокировки (тик мониторинга).
+        signals - пары (снимок SignalData, аргументы для его set_state): снимки переиспользуются между тиками"""
+        with self._acquire_lock():
+            now = time.time()
+            for signal_data, state in signals:
+                if signal_data.signal_id:
+                    if not signal_data.timestamp:
+                        signal_data.timestamp = now
+                    signal_data.set_state(*state)
+                    self.active_signals[signal_data.signal_id] = signal_data
+
+            self.price_updates.update(prices)
+            self.last_update = now
+
+        logger.debug("Обновлены данные %d сигналов и %d символов", len(signals), len(prices))
 
     def update_price_data(self, symbol: str, price_data: Dict[str, Any]):
         """Обновляет ценовые данные для веб-интерфейса"""
@@ -219,13 +288,13 @@ class TradingData:
 
             # Валидация данных
             if 'current_price' not in price_data:
-                logger.warning(f"Ценовые данные для {symbol} не содержат current_price")
+                logger.warning("Ценовые данные для %s не содержат current_price", symbol)
 
             self.price_updates[symbol] = price_data
             self.last_update = time.time()
 
             price = price_data.get('current_price', 'Unknown')
-            logger.debug(f"Обновлены ценовые данные для {symbol}: цена={price}")
+            logger.debug("Обновлены ценовые данные для %s: цена=%s", symbol, price)
 
     def get_processed_data(self) -> Dict[str, Any]:
         """Возвращает обработанные данные с ПРАВИЛЬНЫМИ reached_tps"""
@@ -236,21 +305,21 @@ class TradingData:
                 try:
                     # Создаем минимальную копию необходимых полей
                     processed_signal = {
-                        'signal_id': signal.get('signal_id'),
-                        'symbol': signal.get('symbol'),
-                        'direction': signal.get('direction'),
-                        'take_profits': signal.get('take_profits', []),
-                        'stop_loss': signal.get('stop_loss'),
-                        'timestamp': signal.get('timestamp'),
-                        'source': signal.get('source'),
-                        'entry_prices': signal.get('entry_prices', []),
+                        'signal_id': signal.signal_id,
+                        'symbol': signal.symbol,
+                        'direction': signal.direction,
+                        'take_profits': signal.take_profits,
+                        'stop_loss': signal.stop_loss,
+                        'timestamp': signal.timestamp,
+                        'source': signal.source,
+                        'entry_prices': signal.entry_prices,
                         'reached_tps': [],  # Будет пересчитано
                         'current_price': None,
                         'pnl_percent': 0,
                         'exchange': 'Unknown'
                     }
 
-                    symbol = signal.get('symbol')
+                    symbol = signal.symbol
 
                     # Если есть ценовые данные, ПЕРЕСЧИТЫВАЕМ reached_tps
                     if symbol and symbol in self.price_updates:
@@ -258,8 +327,8 @@ class TradingData:
                         current_price = price_info.get('current_price')
 
                         if current_price is not None:
-                            direction = signal.get('direction')
-                            take_profits = signal.get('take_profits', [])
+                            direction = signal.direction
+                            take_profits = signal.take_profits
 
                             # Пересчитываем reached_tps на основе текущей цены
                             actual_reached_tps = []
@@ -280,11 +349,11 @@ class TradingData:
                     processed_signals[signal_id] = processed_signal
 
                 except Exception as e:
-                    logger.error(f"Ошибка обработки сигнала {signal_id}: {e}")
+                    logger.error("Ошибка обработки сигнала %s: %s", signal_id, e)
                     logger.error(traceback.format_exc())
                     continue
 
-            logger.debug(f"Обработано активных сигналов: {len(processed_signals)}")
+            logger.debug("Обработано активных сигналов: %d", len(processed_signals))
 
             # Возвращаем копии данных для потокобезопасности
             return {
@@ -304,15 +373,14 @@ class TradingData:
 
             for signal_id, signal_data in self.active_signals.items():
                 # Используем timestamp из данных сигнала
-                signal_time = signal_data.get('timestamp', 0)
+                signal_time = signal_data.timestamp or 0
 
                 # Если timestamp невалиден или сигнал слишком старый
                 if signal_time <= 0 or (current_time - signal_time > max_age_seconds):
                     expired_signals.append(signal_id)
 
             for signal_id in expired_signals:
-                symbol = self.active_signals.get(signal_id, {}).get('symbol', 'Unknown')
-                del self.active_signals[signal_id]
+                symbol = self.active_signals.pop(signal_id).symbol
                 logger.info(f"Удален старый сигнал {signal_id} для {symbol}")
 
             return len(expired_signals)
@@ -690,14 +758,14 @@ def start_web_interface():
 def log_request_info():
     """Логирует входящие запросы"""
     if request.path.startswith('/api/'):
-        logger.debug(f"API Request: {request.method} {request.path} from {request.remote_addr}")
+        logger.debug("API Request: %s %s from %s", request.method, request.path, request.remote_addr)
 
 
 @app.after_request
 def log_response_info(response):
     """Логирует исходящие ответы"""
     if request.path.startswith('/api/'):
-        logger.debug(f"API Response: {request.method} {request.path} - {response.status_code}")
+        logger.debug("API Response: %s %s - %s", request.method, request.path, response.status_code)
     return response
 
 